@@ -0,0 +1,280 @@
+import sys
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import List, Tuple
+
+import numpy as np
+
+from scheduler import Task, CPUPower, parse_input
+
+# Response-time and busy-period iterations stop after this many rounds; a
+# task whose response time has not converged by then counts as unschedulable.
+MAX_ITERATIONS = 10_000
+# Task sets are analyzed in chunks of similar size, padded only to the
+# largest set in the chunk, with at most CHUNK_SETS sets and CHUNK_ELEMENTS
+# elements in each (sets, frequencies, tasks, tasks) intermediate of the
+# response-time iteration.
+CHUNK_SETS = 1024
+CHUNK_ELEMENTS = 1 << 22
+# The demand test checks deadlines in blocks of at most this many
+# (point, task, frequency) elements, however many deadlines a set has.
+DEMAND_BLOCK = 1 << 20
+# Float utilizations this close to a test's threshold are recomputed exactly.
+EXACT_MARGIN = 1e-9
+
+@dataclass
+class TaskSetBatch:
+    """Task sets packed into padded arrays, one row per set.
+
+    Deadlines equal periods, as in the scheduler. Padding slots have mask
+    False, a period of 1 and zero WCET, so they add no demand or interference.
+    """
+    periods: np.ndarray    # (sets, tasks) int64
+    deadlines: np.ndarray  # (sets, tasks) int64
+    wcet: np.ndarray       # (sets, tasks, frequencies) int64
+    mask: np.ndarray       # (sets, tasks) bool
+    frequencies: List[int]
+
+    @classmethod
+    def from_task_sets(cls, task_sets: List[List[Task]], frequencies: List[int]) -> 'TaskSetBatch':
+        width = max((len(tasks) for tasks in task_sets), default=0)
+        periods = np.ones((len(task_sets), width), dtype=np.int64)
+        wcet = np.zeros((len(task_sets), width, len(frequencies)), dtype=np.int64)
+        mask = np.zeros((len(task_sets), width), dtype=bool)
+        for b, tasks in enumerate(task_sets):
+            for i, task in enumerate(tasks):
+                periods[b, i] = task.period
+                wcet[b, i] = [task.wcet[freq] for freq in frequencies]
+                mask[b, i] = True
+        return cls(periods, periods.copy(), wcet, mask, list(frequencies))
+
+    def __len__(self) -> int:
+        return len(self.periods)
+
+    def take(self, indices: np.ndarray) -> 'TaskSetBatch':
+        """The sets at indices, padded only as wide as the largest of them."""
+        width = int(self.mask[indices].sum(axis=1).max(initial=0))
+        return TaskSetBatch(self.periods[indices, :width], self.deadlines[indices, :width],
+                            self.wcet[indices, :width], self.mask[indices, :width], self.frequencies)
+
+def size_chunks(sizes: np.ndarray, frequencies: int) -> List[np.ndarray]:
+    """Split set indices into chunks of similar size within the CHUNK_* limits.
+
+    Sets are taken smallest first, and a chunk grows while its sets, padded
+    to the last (largest) one, fit in CHUNK_ELEMENTS.
+    """
+    order = np.argsort(sizes, kind='stable')
+    chunks = []
+    start = 0
+    while start < len(order):
+        stop = start + 1
+        while (stop < len(order) and stop - start < CHUNK_SETS and
+               (stop + 1 - start) * frequencies * int(sizes[order[stop]]) ** 2 <= CHUNK_ELEMENTS):
+            stop += 1
+        chunks.append(order[start:stop])
+        start = stop
+    return chunks
+
+def utilization(batch: TaskSetBatch) -> np.ndarray:
+    """Total utilization sum(C/T) of every set at every frequency, (sets, frequencies)."""
+    return (batch.wcet / batch.periods[:, :, None]).sum(axis=1)
+
+def task_fractions(batch: TaskSetBatch, b: int, f: int) -> List[Tuple[int, int]]:
+    """(C, T) of every task of set b at frequency f, as Python ints."""
+    return [(int(c), int(t)) for c, t, m in zip(batch.wcet[b, :, f], batch.periods[b], batch.mask[b]) if m]
+
+def utilization_bounds(batch: TaskSetBatch, u: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """U <= 1 and U < 1 for every set and frequency, (sets, frequencies) each.
+
+    The float sum can land on either side of 1 when U is exactly 1 (e.g.
+    1/5 + 23/30 + 1/30), so values near 1 are decided with exact fractions.
+    """
+    at_most, below = u <= 1, u < 1
+    for b, f in zip(*np.nonzero(np.abs(u - 1) <= EXACT_MARGIN)):
+        exact = sum((Fraction(c, t) for c, t in task_fractions(batch, b, f)), Fraction(0))
+        at_most[b, f], below[b, f] = exact <= 1, exact < 1
+    return at_most, below
+
+def liu_layland_test(batch: TaskSetBatch) -> np.ndarray:
+    """Sufficient RM test: U <= n(2^(1/n) - 1)."""
+    n = np.maximum(batch.mask.sum(axis=1), 1)
+    bound = n * (2.0 ** (1.0 / n) - 1)
+    return utilization(batch) <= bound[:, None]
+
+def hyperbolic_test(batch: TaskSetBatch) -> np.ndarray:
+    """Sufficient RM test, tighter than Liu and Layland: prod(U_i + 1) <= 2."""
+    product = np.prod(batch.wcet / batch.periods[:, :, None] + 1, axis=1)
+    passed = product <= 2
+    for b, f in zip(*np.nonzero(np.abs(product - 2) <= EXACT_MARGIN)):
+        exact = Fraction(1)
+        for c, t in task_fractions(batch, b, f):
+            exact *= Fraction(c + t, t)
+        passed[b, f] = exact <= 2
+    return passed
+
+def rm_priority_mask(batch: TaskSetBatch) -> np.ndarray:
+    """(sets, tasks, tasks) mask of j having higher RM priority than i.
+
+    Shorter periods win; equal periods go by input order, as in the
+    scheduler.
+    """
+    periods = batch.periods
+    index = np.arange(periods.shape[1])
+    shorter = periods[:, None, :] < periods[:, :, None]
+    tie = (periods[:, None, :] == periods[:, :, None]) & (index[None, :] < index[:, None])[None]
+    return (shorter | tie) & batch.mask[:, None, :] & batch.mask[:, :, None]
+
+def rm_response_times(batch: TaskSetBatch) -> np.ndarray:
+    """Worst-case RM response time of every task, (sets, frequencies, tasks).
+
+    Iterates R = C_i + sum over higher-priority j of ceil(R / T_j) C_j for all
+    tasks of all sets at once. A task whose response time exceeds its
+    deadline stops iterating and keeps that value; padding slots get 0.
+    """
+    higher = rm_priority_mask(batch).astype(np.int64)                 # (B, N, N)
+    wcet = batch.wcet.transpose(0, 2, 1)                              # (B, F, N)
+    periods = batch.periods[:, None, None, :]                         # (B, 1, 1, N)
+    deadlines = np.broadcast_to(batch.deadlines[:, None, :], wcet.shape)
+    response = wcet.copy()
+    active = np.broadcast_to(batch.mask[:, None, :], wcet.shape).copy()
+    for _ in range(MAX_ITERATIONS):
+        active &= response <= deadlines
+        if not active.any():
+            break
+        releases = -(-response[..., None] // periods)                 # ceil(R_i / T_j)
+        interference = (releases * higher[:, None] * wcet[:, :, None, :]).sum(axis=-1)
+        updated = np.where(active, wcet + interference, response)
+        active &= updated != response
+        response = updated
+    else:
+        response = np.where(active, np.iinfo(np.int64).max, response)
+    return response
+
+def rm_test(batch: TaskSetBatch) -> np.ndarray:
+    """Exact RM schedulability by response-time analysis, (sets, frequencies)."""
+    response = rm_response_times(batch)
+    return ((response <= batch.deadlines[:, None, :]) | ~batch.mask[:, None, :]).all(axis=-1)
+
+def busy_period(batch: TaskSetBatch, feasible: np.ndarray) -> np.ndarray:
+    """Length of the synchronous busy period, (sets, frequencies).
+
+    The iteration only converges where U <= 1; elsewhere (feasible False)
+    the result is 0.
+    """
+    wcet = batch.wcet.transpose(0, 2, 1) * feasible[:, :, None]
+    periods = batch.periods[:, None, :]
+    length = wcet.sum(axis=-1)
+    for _ in range(MAX_ITERATIONS):
+        updated = (-(-length[..., None] // periods) * wcet).sum(axis=-1)
+        if np.array_equal(updated, length):
+            break
+        length = updated
+    return length
+
+def edf_demand_test(batch: TaskSetBatch) -> np.ndarray:
+    """Exact EDF schedulability by processor-demand analysis, (sets, frequencies).
+
+    Checks dbf(t) = sum over tasks of max(0, floor((t - D_i) / T_i) + 1) C_i
+    against t at every absolute deadline t up to min(La, Lb), where La is the
+    bound of Baruah et al. and Lb the synchronous busy period. Sets with
+    U > 1 fail without checking. The deadlines of all sets are numbered in
+    one flat range and checked DEMAND_BLOCK elements at a time, so a set
+    with a long busy period costs time but not memory.
+    """
+    u = utilization(batch)
+    feasible, below = utilization_bounds(batch, u)
+    if not feasible.any():
+        return feasible
+
+    periods, deadlines = batch.periods, batch.deadlines
+    slack = ((periods - deadlines) * batch.mask)[:, None, :] * (batch.wcet.transpose(0, 2, 1) / periods[:, None, :])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        la = np.where(below, slack.sum(axis=-1) / (1 - u), np.inf)
+    la = np.maximum(la, np.where(batch.mask, deadlines, 0).max(axis=1)[:, None])
+    bound = np.where(feasible, np.minimum(la, busy_period(batch, feasible)), 0)
+    limit = bound.max(axis=1).astype(np.int64)  # per set, the largest over its frequencies
+
+    # Point p of the flat range is the k-th deadline of (set, task) pair j,
+    # where pair j owns points [ends[j] - jobs[j], ends[j]).
+    jobs = np.where(batch.mask & (deadlines <= limit[:, None]), (limit[:, None] - deadlines) // periods + 1, 0).ravel()
+    ends = np.cumsum(jobs)
+    width = periods.shape[1]
+    step = max(1, DEMAND_BLOCK // (width * len(batch.frequencies)))
+    missed = np.zeros(feasible.shape, dtype=bool)
+    for start in range(0, int(ends[-1]) if len(ends) else 0, step):
+        point = np.arange(start, min(start + step, int(ends[-1])))
+        pair = np.searchsorted(ends, point, side='right')
+        sets = pair // width
+        t = deadlines.ravel()[pair] + periods.ravel()[pair] * (point - (ends[pair] - jobs[pair]))
+        # Tasks of one set share deadlines; check each (set, t) once per block.
+        sets, t = np.unique(np.stack([sets, t]), axis=1)
+        released = np.maximum((t[:, None] - deadlines[sets]) // periods[sets] + 1, 0) * batch.mask[sets]   # (P, N)
+        demand = np.einsum('pn,pnf->pf', released, batch.wcet[sets])
+        np.logical_or.at(missed, sets, demand > t[:, None])
+    return feasible & ~missed
+
+@dataclass
+class Analysis:
+    """Per-set, per-frequency results of analyze(), each (sets, frequencies)."""
+    frequencies: List[int]
+    utilization: np.ndarray
+    liu_layland: np.ndarray
+    hyperbolic: np.ndarray
+    rm: np.ndarray
+    edf: np.ndarray
+
+    def lowest_frequency(self, policy: str) -> List[int]:
+        """Lowest frequency at which each set is schedulable under policy, or 0 if none."""
+        schedulable = self.rm if policy == "RM" else self.edf
+        lowest = []
+        for row in schedulable:
+            feasible = [freq for freq, ok in zip(self.frequencies, row) if ok]
+            lowest.append(min(feasible) if feasible else 0)
+        return lowest
+
+def analyze(task_sets: List[List[Task]], cpu_power: CPUPower) -> Analysis:
+    """Run every test on every task set at every frequency of cpu_power."""
+    batch = TaskSetBatch.from_task_sets(task_sets, cpu_power.frequencies)
+    chunks = size_chunks(batch.mask.sum(axis=1), len(cpu_power.frequencies))
+    parts = []
+    for indices in chunks:
+        chunk = batch.take(indices)
+        parts.append((utilization(chunk), liu_layland_test(chunk), hyperbolic_test(chunk),
+                      rm_test(chunk), edf_demand_test(chunk)))
+    empty = np.zeros((0, len(cpu_power.frequencies)))
+    columns = [np.concatenate(column) for column in zip(*parts)] or [empty] * 5
+    if chunks:
+        # Chunks come in size order; put the rows back in input order.
+        position = np.empty(len(batch), dtype=np.int64)
+        position[np.concatenate(chunks)] = np.arange(len(batch))
+        columns = [column[position] for column in columns]
+    return Analysis(cpu_power.frequencies, *columns)
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python schedulability.py <input_file> [<input_file> ...]")
+        sys.exit(1)
+
+    task_sets = []
+    cpu_power = None
+    for input_file in sys.argv[1:]:
+        tasks, power, _ = parse_input(input_file)
+        task_sets.append(tasks)
+        cpu_power = cpu_power or power
+    result = analyze(task_sets, cpu_power)
+
+    lowest_rm = result.lowest_frequency("RM")
+    lowest_edf = result.lowest_frequency("EDF")
+    for b, input_file in enumerate(sys.argv[1:]):
+        print(f"\n{input_file}:")
+        print("Frequency  Utilization  Liu-Layland  Hyperbolic  RM (RTA)  EDF (demand)")
+        for f, freq in enumerate(result.frequencies):
+            print(f"{freq:>9}  {result.utilization[b, f]:>11.3f}  {yes_no(result.liu_layland[b, f]):>11}  "
+                  f"{yes_no(result.hyperbolic[b, f]):>10}  {yes_no(result.rm[b, f]):>8}  {yes_no(result.edf[b, f]):>12}")
+        print(f"Lowest schedulable frequency: RM {lowest_rm[b] or 'none'}, EDF {lowest_edf[b] or 'none'}")
+
+def yes_no(value: bool) -> str:
+    return "yes" if value else "no"
+
+if __name__ == "__main__":
+    main()
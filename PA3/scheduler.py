@@ -1,8 +1,9 @@
 import sys
+import heapq
+from bisect import bisect_left
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
-from queue import PriorityQueue
-from math import ceil
+from typing import List, Tuple, Dict, Optional
+from math import ceil, inf, lcm
 
 @dataclass
 class Task:
@@ -20,13 +21,21 @@ class TaskInstance:
     policy: str
     period_start: int
     
-    def __lt__(self, other):
+    def sort_key(self) -> Tuple[int, ...]:
         if self.policy == "EDF":
-            if self.deadline != other.deadline:
-                return self.deadline < other.deadline
-            return self.period_start < other.period_start
+            return (self.deadline, self.period_start)
         else:  # RM
-            return self.task.period < other.task.period
+            return (self.task.period,)
+
+    def __lt__(self, other):
+        return self.sort_key() < other.sort_key()
+
+@dataclass
+class Repetition:
+    """The schedule from start_time to end_time repeats until total_time."""
+    start_time: int
+    end_time: int
+    first_entry: int  # index in Scheduler.schedule of the entry at start_time
 
 @dataclass
 class CPUPower:
@@ -60,22 +69,167 @@ def parse_input(filename: str) -> Tuple[List[Task], CPUPower, int]:
 def calculate_energy(power_mw: int, time_s: int) -> float:
     return (power_mw * time_s) / 1000.0
 
+class MinSegmentTree:
+    """Point updates and prefix minimums over a fixed-size array in O(log n)."""
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [inf] * (2 * size)
+
+    def update(self, index: int, value: int) -> None:
+        tree = self.tree
+        index += self.size
+        tree[index] = value
+        index //= 2
+        while index:
+            left, right = tree[2 * index], tree[2 * index + 1]
+            tree[index] = left if left < right else right
+            index //= 2
+
+    def prefix_min(self, end: int) -> float:
+        """Minimum of entries [0, end), or inf if the range is empty."""
+        tree = self.tree
+        result = inf
+        lo, hi = self.size, end + self.size
+        while lo < hi:
+            if lo & 1:
+                if tree[lo] < result:
+                    result = tree[lo]
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                if tree[hi] < result:
+                    result = tree[hi]
+            lo //= 2
+            hi //= 2
+        return result
+
+class ReadyQueue:
+    """Ready jobs in priority order, as a heapq of (sort key, input index, job).
+
+    Two jobs only tie on the sort key when their tasks have equal periods;
+    the task listed first in the input then runs first. A release only
+    pushes the new jobs, O(log n) each: a job that misses its deadline stays
+    in the heap until pop() reaches it and discards it, and once stale
+    entries make up more than half the heap it is rebuilt without them.
+
+    The original scheduler left ties to the layout of a queue it drained,
+    sorted by period and refilled at every release. With legacy_ties set the
+    queue does the same (and every entry's index is 0), which reproduces
+    its schedules exactly at O(n log n) per release.
+    """
+    def __init__(self, order: Dict[str, int], legacy_ties: bool = False):
+        self.heap = []
+        self.order = order  # task name -> input index
+        self.max_jobs = len(order)  # live jobs at any time: one per task
+        self.legacy_ties = legacy_ties
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def push(self, instance: TaskInstance) -> None:
+        tie = 0 if self.legacy_ties else self.order[instance.task.name]
+        heapq.heappush(self.heap, (instance.sort_key(), tie, instance))
+
+    def release(self, instances: List[TaskInstance], current_time: int) -> None:
+        if self.legacy_ties:
+            active = []
+            while self.heap:
+                instance = heapq.heappop(self.heap)[2]
+                if self.is_live(instance, current_time):
+                    active.append(instance)
+            active.extend(instances)
+            active.sort(key=lambda x: x.task.period)
+            for instance in active:
+                self.push(instance)
+            return
+        
+        for instance in instances:
+            self.push(instance)
+        if len(self.heap) > 2 * self.max_jobs:
+            self.heap = [entry for entry in self.heap if self.is_live(entry[2], current_time)]
+            heapq.heapify(self.heap)
+
+    def pop(self, current_time: int) -> Optional[TaskInstance]:
+        """Remove and return the highest-priority live job, or None."""
+        while self.heap:
+            instance = heapq.heappop(self.heap)[2]
+            if self.is_live(instance, current_time):
+                return instance
+        return None
+
+    def live_jobs(self, current_time: int) -> List[TaskInstance]:
+        """Live jobs in an order that, with the heap, fixes which runs next.
+
+        That is priority order, except with legacy_ties, where equal jobs are
+        told apart only by the heap's layout, so they keep it.
+        """
+        entries = self.heap if self.legacy_ties else sorted(self.heap, key=lambda entry: entry[:2])
+        return [instance for _, _, instance in entries if self.is_live(instance, current_time)]
+
+    @staticmethod
+    def is_live(instance: TaskInstance, current_time: int) -> bool:
+        return instance.remaining_time > 0 and instance.deadline > current_time
+
 class Scheduler:
-    def __init__(self, tasks: List[Task], cpu_power: CPUPower, total_time: int):
+    def __init__(self, tasks: List[Task], cpu_power: CPUPower, total_time: int, legacy_ties: bool = False):
         self.tasks = tasks
         self.cpu_power = cpu_power
         self.total_time = total_time
         self.schedule = []
-        self.ready_queue = PriorityQueue()
+        self.task_index = {task.name: i for i, task in enumerate(tasks)}
+        self.ready_queue = ReadyQueue(self.task_index, legacy_ties)
         self.task_instances = {}
         self.next_releases = {}
         self.policy = None
         self.current_period = 0
+        self.hyperperiod = lcm(*(task.period for task in tasks)) if tasks else 0
+
+        # Frequency tables for EE mode, built once per task: for each DVFS
+        # level, its frequency, the task's WCET there relative to the maximum
+        # frequency, and the active power drawn.
+        max_freq = cpu_power.frequencies[0]
+        self.frequency_tables = [tuple((freq, task.wcet[freq] / task.wcet[max_freq], cpu_power.active_power[freq])
+                                       for freq in cpu_power.frequencies)
+                                 for task in tasks]
+        self.repetition = None
+        self.last_state = None
+
+        # Releases live in a min-heap calendar of (release_time, task index)
+        # events. For RM, the next release of any higher-priority task is a
+        # prefix minimum over the tasks ordered by period.
+        self.period_order = sorted(range(len(tasks)), key=lambda i: tasks[i].period)
+        self.sorted_periods = [tasks[i].period for i in self.period_order]
+        self.period_rank = [0] * len(tasks)
+        for rank, i in enumerate(self.period_order):
+            self.period_rank[i] = rank
+        self.reset_releases()
         
         for task in tasks:
-            self.next_releases[task.name] = 0
             self.task_instances[task.name] = None
 
+    def reset_releases(self) -> None:
+        self.next_releases = {task.name: 0 for task in self.tasks}
+        self.release_calendar = []
+        self.release_index = MinSegmentTree(len(self.tasks))
+        for rank in range(len(self.tasks)):
+            self.release_index.update(rank, 0)
+
+    def schedule_release(self, task: Task, release_time: int) -> None:
+        i = self.task_index[task.name]
+        self.next_releases[task.name] = release_time
+        heapq.heappush(self.release_calendar, (release_time, i))
+        self.release_index.update(self.period_rank[i], release_time)
+
+    def discard_stale_releases(self) -> None:
+        # A task rescheduled before its event fired leaves the old event behind.
+        calendar = self.release_calendar
+        while calendar and calendar[0][0] != self.next_releases[self.tasks[calendar[0][1]].name]:
+            heapq.heappop(calendar)
+
+    def next_higher_priority_release(self, task: Task) -> float:
+        """Earliest pending release of a task with a shorter period than task."""
+        return self.release_index.prefix_min(bisect_left(self.sorted_periods, task.period))
+
     def should_preempt(self, current_task: TaskInstance, new_task: TaskInstance, current_time: int) -> bool:
         if self.policy == "EDF":
             if new_task.deadline < current_task.deadline:
@@ -97,24 +251,29 @@ class Scheduler:
             period_start=self.current_period
         )
         self.task_instances[task.name] = instance
-        self.next_releases[task.name] = release_time + task.period
+        self.schedule_release(task, release_time + task.period)
         return instance
 
-    def get_next_release_time(self) -> Tuple[int, List[Task]]:
-        next_time = float('inf')
-        tasks_to_release = []
-        
-        for task in self.tasks:
-            next_release = self.next_releases[task.name]
-            
-            if next_release < self.total_time and next_release > self.current_period:
-                if next_release < next_time:
-                    next_time = next_release
-                    tasks_to_release = [task]
-                elif next_release == next_time:
-                    tasks_to_release.append(task)
-        
-        return next_time, tasks_to_release
+    def get_next_release_time(self) -> float:
+        """Time of the next release before total_time, or inf if there is none.
+
+        Every pending release is later than the current period, since each
+        release reschedules its task one period ahead.
+        """
+        self.discard_stale_releases()
+        if self.release_calendar and self.release_calendar[0][0] < self.total_time:
+            return self.release_calendar[0][0]
+        return float('inf')
+
+    def pop_releases(self, release_time: int) -> List[Task]:
+        """Remove the events at release_time and return their tasks in input order."""
+        released = []
+        calendar = self.release_calendar
+        self.discard_stale_releases()
+        while calendar and calendar[0][0] == release_time:
+            released.append(heapq.heappop(calendar)[1])
+            self.discard_stale_releases()
+        return [self.tasks[i] for i in sorted(released)]
 
     def find_best_frequency(self, task_instance: TaskInstance, current_time: int) -> Tuple[int, int]:
         if not task_instance:
@@ -126,25 +285,21 @@ class Scheduler:
         best_duration = task_instance.remaining_time
         
         if self.policy == "RM":
-            next_high_priority = float('inf')
-            for task in self.tasks:
-                if task.period < task_instance.task.period:
-                    next_release = self.next_releases[task.name]
-                    if next_release > current_time and next_release < next_high_priority:
-                        next_high_priority = next_release
+            # Pending releases are all later than current_time.
+            next_high_priority = self.next_higher_priority_release(task_instance.task)
             
             if next_high_priority < float('inf'):
                 time_to_deadline = min(time_to_deadline, next_high_priority - current_time)
         
-        for freq in self.cpu_power.frequencies:
-            scaled_time = ceil(task_instance.remaining_time * 
-                             (task_instance.task.wcet[freq] / task_instance.task.wcet[self.cpu_power.frequencies[0]]))
+        # Run at each level, then idle until the deadline. The energy terms are
+        # calculate_energy() inlined, so they round exactly as before.
+        remaining_time = task_instance.remaining_time
+        idle_power = self.cpu_power.idle_power
+        for freq, wcet_ratio, active_power in self.frequency_tables[self.task_index[task_instance.task.name]]:
+            scaled_time = ceil(remaining_time * wcet_ratio)
             
             if scaled_time <= time_to_deadline:
-                active_energy = calculate_energy(self.cpu_power.active_power[freq], scaled_time)
-                idle_time = time_to_deadline - scaled_time
-                idle_energy = calculate_energy(self.cpu_power.idle_power, idle_time)
-                total_energy = active_energy + idle_energy
+                total_energy = (active_power * scaled_time) / 1000.0 + (idle_power * (time_to_deadline - scaled_time)) / 1000.0
 
                 if total_energy < min_total_energy:
                     min_total_energy = total_energy
@@ -154,16 +309,12 @@ class Scheduler:
         return best_freq, best_duration
 
     def get_execution_time(self, task: TaskInstance, current_time: int, next_release: int, chosen_freq: int) -> int:
-        scaled_remaining = ceil(task.remaining_time * 
-                              (task.task.wcet[chosen_freq] / task.task.wcet[self.cpu_power.frequencies[0]]))
+        level = self.cpu_power.frequencies.index(chosen_freq)
+        _, wcet_ratio, _ = self.frequency_tables[self.task_index[task.task.name]][level]
+        scaled_remaining = ceil(task.remaining_time * wcet_ratio)
         
         if self.policy == "RM":
-            next_high_priority = float('inf')
-            for task_check in self.tasks:
-                if task_check.period < task.task.period:
-                    next_release_check = self.next_releases[task_check.name]
-                    if next_release_check > current_time and next_release_check < next_high_priority:
-                        next_high_priority = next_release_check
+            next_high_priority = self.next_higher_priority_release(task.task)
             
             if next_high_priority < float('inf'):
                 return min(scaled_remaining, next_high_priority - current_time)
@@ -174,13 +325,9 @@ class Scheduler:
         return next_release - current_time
 
     def update_ready_queue(self, current_time: int, new_tasks: List[Task]) -> None:
-        active_tasks = []
-        
-        while not self.ready_queue.empty():
-            instance = self.ready_queue.get()
-            if instance.remaining_time > 0 and instance.deadline > current_time:
-                active_tasks.append(instance)
-        
+        # A task's previous job has its deadline now, so it expires and is
+        # dropped lazily by the ready queue.
+        released = []
         for task in new_tasks:
             instance = TaskInstance(
                 task=task,
@@ -191,24 +338,53 @@ class Scheduler:
                 original_wcet=task.wcet[self.cpu_power.frequencies[0]],
                 policy=self.policy
             )
-            active_tasks.append(instance)
-            self.next_releases[task.name] = current_time + task.period
-        
-        active_tasks.sort(key=lambda x: x.task.period)
+            released.append(instance)
+            self.schedule_release(task, current_time + task.period)
         
-        for instance in active_tasks:
-            self.ready_queue.put(instance)
+        self.ready_queue.release(released, current_time)
+
+    def release_state(self, current_time: int) -> Tuple:
+        """Ready jobs and pending releases relative to current_time."""
+        jobs = tuple((instance.task.name, instance.remaining_time, instance.deadline - current_time,
+                      instance.period_start - current_time)
+                     for instance in self.ready_queue.live_jobs(current_time))
+        releases = tuple(self.next_releases[task.name] - current_time for task in self.tasks)
+        return jobs, releases
+
+    def check_repetition(self, current_time: int) -> bool:
+        """At a multiple of the hyperperiod, detect a state seen one hyperperiod ago.
+
+        All tasks are released together at time 0, so every hyperperiod starts
+        with the same releases; the schedule repeats from the first hyperperiod
+        whose start state (carried-over jobs included) matches the next one's.
+        """
+        state = self.release_state(current_time)
+        if self.last_state is not None and self.last_state[2] == state:
+            self.repetition = Repetition(self.last_state[0], current_time, self.last_state[1])
+            return True
+        self.last_state = (current_time, len(self.schedule), state)
+        return False
 
-    def run(self, policy: str, energy_efficient: bool = False):
+    def run(self, policy: str, energy_efficient: bool = False, full: bool = False):
+        """Simulate policy up to total_time.
+
+        Unless full is set, the simulation stops once the schedule repeats
+        every hyperperiod, and print_schedule() extrapolates the rest.
+        """
         self.policy = policy
         current_time = 0
         self.current_period = 0
-        self.next_releases = {task.name: 0 for task in self.tasks}
+        self.reset_releases()
         self.update_ready_queue(0, self.tasks)
+        self.repetition = None
+        self.last_state = None
+        extrapolate = not full and 0 < self.hyperperiod < self.total_time
+        if extrapolate:
+            self.check_repetition(0)
         
         while current_time < self.total_time:
-            next_release_time, next_release_tasks = self.get_next_release_time()
-            current_task = None if self.ready_queue.empty() else self.ready_queue.get()
+            next_release_time = self.get_next_release_time()
+            current_task = self.ready_queue.pop(current_time)
             
             if not current_task:
                 idle_duration = min(next_release_time - current_time, self.total_time - current_time)
@@ -240,29 +416,62 @@ class Scheduler:
                     current_task.remaining_time -= execution_time
                 
                 if current_task.remaining_time > 0:
-                    self.ready_queue.put(current_task)
+                    self.ready_queue.push(current_task)
                 
                 current_time += execution_time
             
             if current_time >= next_release_time and next_release_time < float('inf'):
                 self.current_period = next_release_time
-                self.update_ready_queue(next_release_time, next_release_tasks)
+                self.update_ready_queue(next_release_time, self.pop_releases(next_release_time))
+                if extrapolate and next_release_time % self.hyperperiod == 0 and \
+                        self.check_repetition(next_release_time):
+                    break
 
-    def print_schedule(self):
-        total_energy = 0
-        idle_time = 0
+    def clipped_entries(self, entries: List[Tuple], start_time: int, length: int) -> List[Tuple]:
+        """The entries falling in the first length seconds after start_time."""
+        clipped = []
+        for entry_start, task_name, freq, duration, energy in entries:
+            offset = entry_start - start_time
+            if offset >= length:
+                break
+            if offset + duration > length:
+                duration = length - offset
+                power = self.cpu_power.idle_power if task_name == "IDLE" else self.cpu_power.active_power[freq]
+                energy = calculate_energy(power, duration)
+            clipped.append((entry_start, task_name, freq, duration, energy))
+        return clipped
+
+    def schedule_totals(self) -> Tuple[float, Dict]:
+        """Total energy and time per frequency (and IDLE) up to total_time."""
         freq_distribution = {1188: 0, 918: 0, 648: 0, 384: 0, 'IDLE': 0}
-        
+
+        def add(entries: List[Tuple], times: int = 1) -> float:
+            energy_sum = 0
+            for _, task_name, freq, duration, energy in entries:
+                freq_distribution['IDLE' if task_name == "IDLE" else freq] += duration * times
+                energy_sum += energy
+            return energy_sum * times
+
+        total_energy = add(self.schedule)
+        if self.repetition:
+            rep = self.repetition
+            period_entries = self.schedule[rep.first_entry:]
+            hyperperiods, tail = divmod(self.total_time - rep.end_time, rep.end_time - rep.start_time)
+            total_energy += add(period_entries, hyperperiods)
+            total_energy += add(self.clipped_entries(period_entries, rep.start_time, tail))
+        return total_energy, freq_distribution
+
+    def print_schedule(self):
         print("\nSchedule:")
         for start_time, task_name, freq, duration, energy in self.schedule:
-            if task_name == "IDLE":
-                idle_time += duration
-                freq_distribution['IDLE'] += duration
-            else:
-                freq_distribution[freq] += duration
             print(f"{start_time} {task_name} {freq} {duration} {energy:.3f}J")
-            total_energy += energy
-        
+        if self.repetition:
+            rep = self.repetition
+            print(f"... schedule from {rep.start_time}s to {rep.end_time}s repeats every "
+                  f"{rep.end_time - rep.start_time}s (hyperperiod) until {self.total_time}s")
+
+        total_energy, freq_distribution = self.schedule_totals()
+        idle_time = freq_distribution['IDLE']
         print(f"\nTotal Energy Consumption: {total_energy:.3f}J")
         print(f"Percentage of time spent idle: {(idle_time/self.total_time)*100:.2f}%")
         print(f"Total System Execution Time: {self.total_time}s")
@@ -273,20 +482,22 @@ class Scheduler:
 
 def main():
     if len(sys.argv) < 3:
-        print("Usage: python scheduler.py <input_file> <EDF|RM> [EE]")
+        print("Usage: python scheduler.py <input_file> <EDF|RM> [EE] [--full] [--legacy-ties]")
         sys.exit(1)
         
     input_file = sys.argv[1]
     policy = sys.argv[2]
     energy_efficient = len(sys.argv) > 3 and sys.argv[3] == "EE"
+    full = "--full" in sys.argv[3:]  # simulate every hyperperiod literally
+    legacy_ties = "--legacy-ties" in sys.argv[3:]  # break equal-period ties as the original queue did
     
     if policy not in ["EDF", "RM"]:
         print("Policy must be either EDF or RM")
         sys.exit(1)
     
     tasks, cpu_power, total_time = parse_input(input_file)
-    scheduler = Scheduler(tasks, cpu_power, total_time)
-    scheduler.run(policy, energy_efficient)
+    scheduler = Scheduler(tasks, cpu_power, total_time, legacy_ties)
+    scheduler.run(policy, energy_efficient, full)
     scheduler.print_schedule()
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from gen_trace import TraceGenerator
+from mem_sim import ALGORITHMS, MemorySystem, simulate, system_options, trace_chunks
+from trace_io import BinaryTraceWriter
+
+# Benchmark traces: four processes mixing zipf and phased access over 1024
+# pages each, so every memory size below still has to evict.
+BENCH_ADDRESS_BITS = 20
+BENCH_PAGES = 1024
+
+
+def make_trace(directory: str, references: int, seed: int = 0) -> str:
+    path = os.path.join(directory, f"bench_{references}.bin")
+    generator = TraceGenerator(['zipf', 'phased'], processes=4, pages=BENCH_PAGES,
+                               address_bits=BENCH_ADDRESS_BITS, seed=seed)
+    with BinaryTraceWriter(path) as writer:
+        for chunk in generator.generate(references):
+            writer.write(chunk)
+    return path
+
+
+def time_simulate(input_file: str, algorithm: str, frames: int, repeat: int) -> float:
+    """Best wall time of the whole simulate() path, OPT's index included."""
+    best = float('inf')
+    for _ in range(repeat):
+        random.seed(0)
+        start = time.perf_counter()
+        simulate(input_file, algorithm, physical_pages=frames, address_bits=BENCH_ADDRESS_BITS)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_victims(input_file: str, algorithm: str, frames: int) -> Tuple[int, float]:
+    """Number of select_victim_page() calls and the total time spent in them."""
+    options = {'physical_pages': frames, 'address_bits': BENCH_ADDRESS_BITS}
+    system = MemorySystem(algorithm, **system_options(input_file, algorithm, options))
+    select_victim_page = system.select_victim_page
+    totals = [0, 0.0]
+
+    def timed_select_victim_page() -> int:
+        start = time.perf_counter()
+        frame = select_victim_page()
+        totals[1] += time.perf_counter() - start
+        totals[0] += 1
+        return frame
+
+    # The instance attribute shadows the method for handle_page_fault().
+    system.select_victim_page = timed_select_victim_page
+    random.seed(0)
+    for chunk in trace_chunks(input_file):
+        system.run_chunk(chunk)
+    return totals[0], totals[1]
+
+
+def cell_name(algorithm: str, references: int, frames: int) -> str:
+    return f"{algorithm} refs={references} frames={frames}"
+
+
+def run_suite(algorithms: List[str], trace_sizes: List[int], memory_sizes: List[int],
+              repeat: int) -> Dict[str, Dict[str, float]]:
+    cells = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for references in trace_sizes:
+            trace = make_trace(tmp, references)
+            for algorithm in algorithms:
+                for frames in memory_sizes:
+                    seconds = time_simulate(trace, algorithm, frames, repeat)
+                    victims, victim_seconds = time_victims(trace, algorithm, frames)
+                    name = cell_name(algorithm, references, frames)
+                    cells[name] = {
+                        'refs_per_sec': references / seconds,
+                        'victims': victims,
+                        'victim_ns': 1e9 * victim_seconds / victims if victims else 0.0,
+                    }
+                    print(f"{name}: {cells[name]['refs_per_sec']:,.0f} refs/s, "
+                          f"{victims} victims at {cells[name]['victim_ns']:,.0f} ns each", file=sys.stderr)
+    return cells
+
+
+def find_regressions(cells: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                     threshold: float) -> List[str]:
+    """Cells whose refs/sec fell below threshold percent of the baseline."""
+    regressions = []
+    for name, cell in cells.items():
+        if name not in baseline:
+            continue
+        floor = baseline[name]['refs_per_sec'] * threshold / 100
+        if cell['refs_per_sec'] < floor:
+            regressions.append(f"{name}: {cell['refs_per_sec']:,.0f} refs/s is below {threshold:g}% "
+                               f"of the baseline {baseline[name]['refs_per_sec']:,.0f} refs/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput benchmarks for the page replacement algorithms')
+    parser.add_argument('--algorithms', nargs='+', choices=ALGORITHMS, default=ALGORITHMS,
+                        help='Page replacement algorithms to benchmark')
+    parser.add_argument('--trace-sizes', nargs='+', type=int, default=[100_000, 1_000_000],
+                        help='Synthetic trace lengths in references')
+    parser.add_argument('--memory-sizes', nargs='+', type=int, default=[32, 256],
+                        help='Physical memory sizes in frames')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per cell; the fastest one counts')
+    parser.add_argument('--baseline', default='bench_baseline.json',
+                        help='JSON file holding the baseline results')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store this run as the new baseline instead of comparing against it')
+    parser.add_argument('--threshold', type=float, default=80.0,
+                        help='Fail when refs/sec falls below this percentage of the baseline')
+    parser.add_argument('--output', help='Also write this run\'s results to this JSON file')
+
+    args = parser.parse_args()
+    # Check before running the suite: comparing against nothing must fail,
+    # not pass silently.
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f"no baseline at {args.baseline}; run with --save-baseline first")
+
+    results = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cells': run_suite(args.algorithms, args.trace_sizes, args.memory_sizes, args.repeat),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results['cells'], baseline['cells'], args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print(f"All cells within {args.threshold:g}% of the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import pickle
+import struct
+import sys
+import time
+from typing import Optional
+
+# Checkpoint layout: magic, format version and the number of references
+# already simulated (the trace offset to resume from), then the pickled
+# MemorySystem. Page tables are arrays and bytearrays, which pickle as raw
+# bytes, so the file stays close to the in-memory size.
+CHECKPOINT_MAGIC = b'MEMCKP01'
+CHECKPOINT_HEADER = struct.Struct('<8sIQ')
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(system, path: str) -> None:
+    """Write system to path atomically; an older checkpoint survives a crash."""
+    temp_file = f"{path}.{os.getpid()}.tmp"
+    with open(temp_file, 'wb') as f:
+        f.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, system.time))
+        pickle.dump(system, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_file, path)
+
+
+class _Unpickler(pickle.Unpickler):
+    # A checkpoint written by `python3 mem_sim.py` refers to __main__ classes;
+    # load them from the mem_sim module when __main__ is something else.
+    def find_class(self, module: str, name: str):
+        if module == '__main__' and not hasattr(sys.modules['__main__'], name):
+            module = 'mem_sim'
+        return super().find_class(module, name)
+
+
+def load_checkpoint(path: str):
+    """Return the MemorySystem saved in path.
+
+    OPT's next-use index is not stored; callers rebuild it from the trace.
+    """
+    with open(path, 'rb') as f:
+        magic, version, _ = CHECKPOINT_HEADER.unpack(f.read(CHECKPOINT_HEADER.size))
+        if magic != CHECKPOINT_MAGIC:
+            raise ValueError(f"{path} is not a mem_sim checkpoint")
+        if version != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} has checkpoint version {version}, expected {CHECKPOINT_VERSION}")
+        return _Unpickler(f).load()
+
+
+class Checkpointer:
+    """Saves a MemorySystem every interval seconds without stopping it.
+
+    Where os.fork() exists the snapshot is written by a forked child, which
+    gets a copy-on-write image of the parent's memory, so the simulation only
+    pauses for the fork itself (a few milliseconds). Elsewhere the snapshot
+    is written inline.
+    """
+
+    def __init__(self, system, path: str, interval: float):
+        self.system = system
+        self.path = path
+        self.interval = interval
+        self.last = time.monotonic()
+        self.child: Optional[int] = None
+
+    def maybe_save(self) -> None:
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.save()
+            self.last = now
+
+    def save(self) -> None:
+        self.wait()  # at most one snapshot in flight
+        if not hasattr(os, 'fork'):
+            save_checkpoint(self.system, self.path)
+            return
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                save_checkpoint(self.system, self.path)
+                status = 0
+            finally:
+                os._exit(status)
+        self.child = pid
+
+    def wait(self) -> None:
+        if self.child is not None:
+            _, status = os.waitpid(self.child, 0)
+            self.child = None
+            if status:
+                raise RuntimeError(f"writing checkpoint {self.path} failed")
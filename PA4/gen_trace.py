@@ -0,0 +1,184 @@
+import argparse
+import sys
+from typing import Iterator, List
+
+import numpy as np
+
+from mem_sim import MemorySystem
+from trace_io import CHUNK_SIZE, RECORD_DTYPE, STDIN, BinaryTraceWriter
+
+PATTERNS = ['zipf', 'phased', 'scan']
+
+
+class TraceGenerator:
+    """Seeded synthetic reference streams, generated one chunk at a time.
+
+    Each process follows one access pattern over its own set of pages:
+
+    - zipf: page ranks drawn from a Zipf distribution with the given exponent
+    - phased: uniform references within a working set of working_set pages
+      that moves to a new place every phase_length references
+    - scan: a sequential walk through the pages, scan_stride bytes at a time
+
+    Processes take turns in bursts of quantum references. A process's pages
+    are spread over its virtual address space by an odd multiplier and an
+    offset (a bijection modulo the number of pages), so hot pages are not
+    all neighbours; scans keep consecutive pages consecutive.
+    Only the current chunk is ever held in memory, so the trace length is
+    unbounded.
+    """
+
+    def __init__(self, patterns: List[str] = ('zipf',), processes: int = 1, quantum: int = 1000,
+                 pages: int = None, page_size: int = MemorySystem.PAGE_SIZE,
+                 address_bits: int = MemorySystem.VIRTUAL_ADDRESS_BITS, write_ratio: float = 0.3,
+                 zipf_exponent: float = 1.0, phase_length: int = 100_000, working_set: int = 16,
+                 scan_stride: int = 64, seed: int = 0):
+        if page_size <= 0 or page_size & (page_size - 1):
+            raise ValueError(f"page size must be a power of two, got {page_size}")
+        self.page_shift = page_size.bit_length() - 1
+        if not self.page_shift < address_bits <= 64:
+            raise ValueError(f"address width must be between {self.page_shift + 1} and 64 bits, got {address_bits}")
+        self.pages_per_process = 1 << (address_bits - self.page_shift)
+        self.pages = pages or self.pages_per_process
+        if not 0 < self.pages <= self.pages_per_process:
+            raise ValueError(f"pages must be between 1 and {self.pages_per_process}, got {self.pages}")
+        for pattern in patterns:
+            if pattern not in PATTERNS:
+                raise ValueError(f"Unknown pattern: {pattern}")
+        if not 0 <= write_ratio <= 1:
+            raise ValueError(f"write ratio must be between 0 and 1, got {write_ratio}")
+
+        self.page_size = page_size
+        self.processes = processes
+        self.quantum = quantum
+        self.write_ratio = write_ratio
+        self.phase_length = phase_length
+        self.working_set = min(working_set, self.pages)
+        self.scan_stride = scan_stride
+        self.seed = seed
+        self.pattern_of = [patterns[pid % len(patterns)] for pid in range(processes)]
+
+        seeds = np.random.SeedSequence(seed).spawn(processes + 1)
+        self.rng = np.random.default_rng(seeds[0])
+        self.process_rngs = [np.random.default_rng(s) for s in seeds[1:]]
+        self.multiplier = (self.rng.integers(0, self.pages_per_process // 2, processes, dtype=np.uint64)
+                           * np.uint64(2) + np.uint64(1))
+        self.base = self.rng.integers(0, self.pages_per_process, processes, dtype=np.uint64)
+        self.position = np.zeros(processes, dtype=np.int64)  # references generated so far per process
+        self.generated = 0
+
+        if 'zipf' in patterns:
+            weights = 1.0 / np.arange(1, self.pages + 1, dtype=np.float64) ** zipf_exponent
+            self.zipf_cdf = np.cumsum(weights / weights.sum())
+
+    def chunk(self, count: int) -> np.ndarray:
+        index = self.generated + np.arange(count, dtype=np.int64)
+        pids = (index // self.quantum) % self.processes
+        records = np.empty(count, dtype=RECORD_DTYPE)
+        records['pid'] = pids
+
+        # Group the chunk's positions by process; each group continues that
+        # process's own stream where the previous chunk left it.
+        order = np.argsort(pids, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(pids, minlength=self.processes))])
+        for pid in range(self.processes):
+            positions = order[bounds[pid]:bounds[pid + 1]]
+            if len(positions):
+                local = self.position[pid] + np.arange(len(positions), dtype=np.int64)
+                records['address'][positions] = self.addresses(pid, local)
+                self.position[pid] += len(positions)
+
+        records['write'] = self.rng.random(count) < self.write_ratio
+        self.generated += count
+        return records
+
+    def addresses(self, pid: int, local: np.ndarray) -> np.ndarray:
+        rng = self.process_rngs[pid]
+        pattern = self.pattern_of[pid]
+        count = len(local)
+        if pattern == 'scan':
+            offset = local * self.scan_stride
+            ranks = (offset >> self.page_shift) % self.pages
+            vpns = (ranks.astype(np.uint64) + self.base[pid]) % np.uint64(self.pages_per_process)
+            return (vpns << np.uint64(self.page_shift)) | (offset & (self.page_size - 1)).astype(np.uint64)
+
+        if pattern == 'zipf':
+            ranks = np.minimum(np.searchsorted(self.zipf_cdf, rng.random(count), side='right'), self.pages - 1)
+        else:
+            # A phase's working set depends only on (seed, pid, phase), so it
+            # is the same however the trace is cut into chunks.
+            phases, inverse = np.unique(local // self.phase_length, return_inverse=True)
+            starts = np.array([np.random.default_rng([self.seed, pid, int(phase)]).integers(self.pages)
+                               for phase in phases], dtype=np.int64)
+            ranks = (starts[inverse] + rng.integers(0, self.working_set, count)) % self.pages
+
+        # uint64 arithmetic wraps modulo 2**64, which the power-of-two page
+        # count divides, so the mapping stays exact for 64-bit spaces.
+        vpns = (ranks.astype(np.uint64) * self.multiplier[pid] + self.base[pid]) % np.uint64(self.pages_per_process)
+        offsets = rng.integers(0, self.page_size, count, dtype=np.uint64)
+        return (vpns << np.uint64(self.page_shift)) | offsets
+
+    def generate(self, references: int, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+        for start in range(0, references, chunk_size):
+            yield self.chunk(min(chunk_size, references - start))
+
+
+def write_text(chunks: Iterator[np.ndarray], output_file: str) -> None:
+    f = sys.stdout if output_file == STDIN else open(output_file, 'w')
+    try:
+        for chunk in chunks:
+            access = ('R', 'W')
+            f.write(''.join(f"{pid} {address} {access[write]}\n" for pid, address, write in
+                            zip(chunk['pid'].tolist(), chunk['address'].tolist(), chunk['write'].tolist())))
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic memory reference trace')
+    parser.add_argument('output_file', help='Path of the trace to write, or "-" for standard output')
+    parser.add_argument('--references', type=int, default=1_000_000,
+                        help='Number of references to generate')
+    parser.add_argument('--format', choices=['text', 'binary'], default='text',
+                        help='Text ("<pid> <address> <R|W>" lines) or the binary trace format')
+    parser.add_argument('--patterns', nargs='+', choices=PATTERNS, default=['zipf'],
+                        help='Access pattern of each process, assigned round-robin')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Number of processes interleaved in the trace')
+    parser.add_argument('--quantum', type=int, default=1000,
+                        help='References each process issues before the next one takes over')
+    parser.add_argument('--pages', type=int,
+                        help='Distinct pages each process touches (default: its whole address space)')
+    parser.add_argument('--page-size', type=int, default=MemorySystem.PAGE_SIZE,
+                        help='Page size in bytes (power of two)')
+    parser.add_argument('--address-bits', type=int, default=MemorySystem.VIRTUAL_ADDRESS_BITS,
+                        help='Width of each process\'s virtual address space in bits')
+    parser.add_argument('--write-ratio', type=float, default=0.3,
+                        help='Fraction of references that are writes')
+    parser.add_argument('--zipf-exponent', type=float, default=1.0,
+                        help='Skew of the zipf pattern')
+    parser.add_argument('--phase-length', type=int, default=100_000,
+                        help='References per phase of the phased pattern')
+    parser.add_argument('--working-set', type=int, default=16,
+                        help='Working set size in pages of the phased pattern')
+    parser.add_argument('--scan-stride', type=int, default=64,
+                        help='Bytes between consecutive references of the scan pattern')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed; the same seed and options give the same trace')
+
+    args = parser.parse_args()
+
+    generator = TraceGenerator(args.patterns, args.processes, args.quantum, args.pages, args.page_size,
+                               args.address_bits, args.write_ratio, args.zipf_exponent, args.phase_length,
+                               args.working_set, args.scan_stride, args.seed)
+    chunks = generator.generate(args.references)
+    if args.format == 'text':
+        write_text(chunks, args.output_file)
+    else:
+        with BinaryTraceWriter(args.output_file, header_count=args.references) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+
+if __name__ == "__main__":
+    main()
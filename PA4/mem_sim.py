@@ -1,8 +1,33 @@
 import argparse
+from array import array
 from dataclasses import dataclass
 from enum import Enum
-import random
-from typing import Dict, List, Optional, Set, Tuple
+import math
+from multiprocessing import Pool, shared_memory
+import os
+import shutil
+from statistics import NormalDist
+import sys
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from checkpoint import Checkpointer, load_checkpoint
+from policies import POLICIES
+from telemetry import DEFAULT_WINDOW, TelemetryRecorder
+from trace_io import (CHUNK_SIZE, RECORD_DTYPE, RUN_DTYPE, STDIN, BinaryTraceWriter, coalesce_chunks, convert_text_trace,
+                      is_binary_trace, iter_trace_chunks, load_binary_trace, load_run_trace, skip_references,
+                      trace_kind)
+
+ALGORITHMS = list(POLICIES)
+DEFAULT_ALGORITHMS = ['RAND', 'FIFO', 'LRU', 'PER']
+DEFAULT_CHECKPOINT_INTERVAL = 300.0  # seconds
+SHARD_BUFFER = 1 << 22  # records shard_trace buffers before appending them to the shards
+# OPT's next-use index takes 8 bytes per reference. Past this many references
+# it goes to a temporary memory-mapped file instead of RAM.
+OPT_INDEX_IN_MEMORY = 1 << 27
 
 class AccessType(Enum):
     READ = 'R'
@@ -32,144 +57,437 @@ class SimulationResult:
                 f"Disk References: {self.disk_references}\n"
                 f"Dirty Page Writes: {self.dirty_writes}")
 
+@dataclass
+class ReplicaStats:
+    metric: str
+    mean: float
+    std: float
+    low: float
+    high: float
+    confidence: float
+
+    def __str__(self) -> str:
+        return (f"{self.metric}: mean {self.mean:.1f}, std {self.std:.1f}, "
+                f"{self.confidence:.0%} CI [{self.low:.1f}, {self.high:.1f}]")
+
 class Process:
-    def __init__(self, pid: int):
+    def __init__(self, pid: int, max_pages: int = 128):
         self.pid = pid
-        self.page_table: List[PageTableEntry] = [
-            PageTableEntry(i, None) for i in range(128)  # 128 pages per process
-        ]
+        self.page_table = PageTable(max_pages)
 
 @dataclass
 class PageTableEntry:
     virtual_page: int
     physical_frame: Optional[int]
     dirty: bool = False
-    referenced: bool = False
+    reference_epoch: int = -1  # referenced iff equal to MemorySystem.epoch
     last_access_time: int = 0
 
+class PageTable:
+    """Hashed, struct-of-arrays page table.
+
+    index maps a virtual page number to a slot in the frame, dirty,
+    reference_epoch and last_access_time columns. Only pages the process has
+    touched get a slot, so memory grows with the pages used rather than with
+    the size of the virtual address space.
+    """
+    NO_FRAME = -1
+
+    def __init__(self, max_pages: int = 128):
+        self.max_pages = max_pages
+        self.index: Dict[int, int] = {}
+        self.frame = array('q')
+        self.dirty = bytearray()
+        self.reference_epoch = array('q')  # referenced iff equal to MemorySystem.epoch
+        self.last_access_time = array('q')
+
+    def add(self, page_number: int) -> int:
+        if page_number >= self.max_pages:
+            raise IndexError(f"virtual page {page_number} is out of range")
+        slot = len(self.index)
+        self.index[page_number] = slot
+        self.frame.append(self.NO_FRAME)
+        self.dirty.append(0)
+        self.reference_epoch.append(-1)
+        self.last_access_time.append(0)
+        return slot
+
+    def entry(self, page_number: int) -> PageTableEntry:
+        """Return a snapshot of one page's state."""
+        slot = self.index.get(page_number)
+        if slot is None:
+            return PageTableEntry(page_number, None)
+        frame = self.frame[slot]
+        return PageTableEntry(
+            virtual_page=page_number,
+            physical_frame=None if frame == self.NO_FRAME else frame,
+            dirty=bool(self.dirty[slot]),
+            reference_epoch=self.reference_epoch[slot],
+            last_access_time=self.last_access_time[slot]
+        )
+
 class MemorySystem:
     PAGE_SIZE = 512  # bytes
+    VIRTUAL_ADDRESS_BITS = 16  # 64KB per process
     PHYSICAL_PAGES = 32
     REFERENCE_RESET_INTERVAL = 200
 
-    def __init__(self, algorithm: str):
+    def __init__(self, algorithm: str, page_size: Optional[int] = None,
+                 address_bits: Optional[int] = None, physical_pages: Optional[int] = None,
+                 reset_interval: Optional[int] = None, next_use: Optional[np.ndarray] = None,
+                 seed: Optional[int] = None):
         self.algorithm = algorithm.upper()
+        self.page_size = page_size or self.PAGE_SIZE
+        self.address_bits = address_bits or self.VIRTUAL_ADDRESS_BITS
+        self.physical_pages = physical_pages or self.PHYSICAL_PAGES
+        self.reset_interval = reset_interval or self.REFERENCE_RESET_INTERVAL
+        if self.page_size & (self.page_size - 1):
+            raise ValueError(f"page size must be a power of two, got {self.page_size}")
+        self.page_shift = self.page_size.bit_length() - 1
+        if not self.page_shift < self.address_bits <= 64:
+            raise ValueError(f"virtual address width must be between {self.page_shift + 1} and 64 bits")
+        self.pages_per_process = 1 << (self.address_bits - self.page_shift)
         self.processes: Dict[int, Process] = {}
         self.physical_memory: List[Tuple[int, int]] = []  # List of (pid, vpn) pairs
         self.time = 0
+        self.skipped = 0  # references made outside this system (see skip)
         self.page_faults = 0
         self.disk_references = 0
         self.dirty_writes = 0
         self.references_since_reset = 0
+        # Reference bits are epochs: a page is referenced when its
+        # reference_epoch equals self.epoch, so resetting them is O(1).
+        self.epoch = 0
+        self.next_use = next_use
+        self.seed = seed  # RAND's private RNG seed; None uses the global random module
+        if self.algorithm not in POLICIES:
+            raise ValueError(f"unknown page replacement algorithm {algorithm!r}")
+        self.policy = POLICIES[self.algorithm](self)
+        # Hooks the policy leaves as None are skipped on the hot path
+        self.on_access = self.policy.on_access
+        self.on_fault = self.policy.on_fault
+        self.on_evict = self.policy.on_evict
+        self.tick = self.policy.tick
+
+    def __getstate__(self) -> dict:
+        # Checkpoints leave out OPT's next-use index, which is derived from
+        # the trace and as long as it.
+        return {**self.__dict__, 'next_use': None}
 
     def get_page_number(self, address: int) -> int:
-        return address >> 9  # Get the 7 most significant bits
+        return address >> self.page_shift  # Drop the page offset bits
 
     def get_process(self, pid: int) -> Process:
         if pid not in self.processes:
-            self.processes[pid] = Process(pid)
+            self.processes[pid] = Process(pid, self.pages_per_process)
         return self.processes[pid]
 
     def handle_memory_access(self, ref: MemoryReference) -> None:
+        self.access(ref.process_id, ref.address, ref.access_type == AccessType.WRITE)
+
+    def run_chunk(self, chunk: np.ndarray, positions: Optional[np.ndarray] = None) -> None:
+        """Apply a chunk of references or runs.
+
+        positions, when given, holds each record's index in a larger trace
+        (a --local shard's place in the whole trace); the references in
+        between are skipped over before each record.
+        """
+        if positions is not None and len(chunk):
+            counts = chunk['count'].astype(np.int64) if chunk.dtype == RUN_DTYPE else 1
+            gaps = positions - np.append(self.time, (positions + counts)[:-1])
+            bounds = np.flatnonzero(gaps).tolist() + [len(chunk)]
+            if bounds[0] != 0:
+                bounds.insert(0, 0)
+            for start, stop in zip(bounds, bounds[1:]):
+                self.skip(int(gaps[start]))
+                self.run_chunk(chunk[start:stop])
+            return
+        
+        if chunk.dtype == RUN_DTYPE:
+            access_run = self.access_run
+            for pid, address, count, is_write in zip(chunk['pid'].tolist(), chunk['address'].tolist(),
+                                                     chunk['count'].tolist(), chunk['write'].tolist()):
+                access_run(pid, address, count, is_write)
+            return
+        
+        access = self.access
+        for pid, address, is_write in zip(chunk['pid'].tolist(), chunk['address'].tolist(),
+                                          chunk['write'].tolist()):
+            access(pid, address, is_write)
+
+    def access_run(self, pid: int, address: int, count: int, is_write: bool) -> None:
+        """Apply count back-to-back references to one page in a single step.
+
+        is_write is True when any of them writes. Only the first reference
+        can fault, so it goes through access(); the rest are hits that just
+        advance the clock, fire any ticks they cross and leave the page with
+        the last reference's access time. Setting the dirty bit early is
+        safe because no victim is chosen inside the run.
+        """
+        self.access(pid, address, is_write)
+        rest = count - 1
+        if rest <= 0:
+            return
+        
+        self.advance(rest)
+        table = self.processes[pid].page_table
+        slot = table.index[self.get_page_number(address)]
+        first_reference = table.reference_epoch[slot] != self.epoch
+        table.reference_epoch[slot] = self.epoch
+        table.last_access_time[slot] = self.time
+        if self.on_access is not None:
+            self.on_access(table.frame[slot], False, first_reference, table.dirty[slot])
+
+    def advance(self, count: int) -> None:
+        """Move the clock on by count references, firing any ticks they cross."""
+        self.time += count
+        if self.tick is not None:
+            total = self.references_since_reset + count
+            for _ in range(total // self.reset_interval):
+                self.tick()
+            self.references_since_reset = total % self.reset_interval
+        else:
+            self.references_since_reset += count
+
+    def skip(self, count: int) -> None:
+        """Let count references made by processes outside this system go by.
+
+        Under local replacement each process is simulated on its own, but
+        the clock, and with it PER's reset interval and FIFO's cursor, still
+        follows the whole trace.
+        """
+        if count > 0:
+            self.advance(count)
+            self.skipped += count
+
+    def access(self, pid: int, address: int, is_write: bool) -> None:
         self.time += 1
         self.references_since_reset += 1
         
-        if self.references_since_reset == self.REFERENCE_RESET_INTERVAL and self.algorithm == 'PER':
-            self.reset_reference_bits()
+        if self.references_since_reset == self.reset_interval and self.tick is not None:
+            self.tick()
             self.references_since_reset = 0
 
-        process = self.get_process(ref.process_id)
-        page_number = self.get_page_number(ref.address)
-        page_entry = process.page_table[page_number]
+        process = self.processes.get(pid)
+        if process is None:
+            process = self.get_process(pid)
+        table = process.page_table
+        page_number = self.get_page_number(address)
+        slot = table.index.get(page_number)
+        if slot is None:
+            slot = table.add(page_number)
 
-        if page_entry.physical_frame is None:
-            self.handle_page_fault(process, page_number)
+        frame = table.frame[slot]
+        faulted = frame == PageTable.NO_FRAME
+        if faulted:
+            frame = self.handle_page_fault(process, page_number, slot)
 
-        page_entry.referenced = True
-        page_entry.last_access_time = self.time
-        if ref.access_type == AccessType.WRITE:
-            page_entry.dirty = True
+        first_reference = table.reference_epoch[slot] != self.epoch
+        table.reference_epoch[slot] = self.epoch
+        table.last_access_time[slot] = self.time
+        if is_write:
+            table.dirty[slot] = 1
 
-    def handle_page_fault(self, process: Process, page_number: int) -> None:
+        if self.on_access is not None:
+            self.on_access(frame, faulted, first_reference, table.dirty[slot])
+
+    def handle_page_fault(self, process: Process, page_number: int, slot: int) -> int:
         self.page_faults += 1
         self.disk_references += 1
+        if self.on_fault is not None:
+            self.on_fault(process.pid, page_number)
 
-        if len(self.physical_memory) < self.PHYSICAL_PAGES:
+        if len(self.physical_memory) < self.physical_pages:
             frame_number = len(self.physical_memory)
             self.physical_memory.append((process.pid, page_number))
-            process.page_table[page_number].physical_frame = frame_number
+            process.page_table.frame[slot] = frame_number
+            return frame_number
         else:
             victim_frame = self.select_victim_page()
             victim_pid, victim_vpn = self.physical_memory[victim_frame]
-            victim_process = self.processes[victim_pid]
-            victim_page = victim_process.page_table[victim_vpn]
+            victim_table = self.processes[victim_pid].page_table
+            victim_slot = victim_table.index[victim_vpn]
 
-            if victim_page.dirty:
+            if victim_table.dirty[victim_slot]:
                 self.disk_references += 1
                 self.dirty_writes += 1
 
-            victim_page.physical_frame = None
-            process.page_table[page_number].physical_frame = victim_frame
+            victim_table.frame[victim_slot] = PageTable.NO_FRAME
+            if self.on_evict is not None:
+                self.on_evict(victim_frame, victim_pid, victim_vpn)
+            process.page_table.frame[slot] = victim_frame
             self.physical_memory[victim_frame] = (process.pid, page_number)
+            return victim_frame
 
     def select_victim_page(self) -> int:
-        if self.algorithm == 'RAND':
-            return random.randrange(self.PHYSICAL_PAGES)
-        
-        elif self.algorithm == 'FIFO':
-            return 0  # Always replace the first page (rotate the list after)
-        
-        elif self.algorithm == 'LRU':
-            min_time = float('inf')
-            victim_frame = 0
-            for frame, (pid, vpn) in enumerate(self.physical_memory):
-                page = self.processes[pid].page_table[vpn]
-                if page.last_access_time < min_time:
-                    min_time = page.last_access_time
-                    victim_frame = frame
-                elif page.last_access_time == min_time:
-                    current_dirty = self.processes[pid].page_table[vpn].dirty
-                    victim_dirty = self.processes[self.physical_memory[victim_frame][0]].page_table[self.physical_memory[victim_frame][1]].dirty
-                    if (not current_dirty and victim_dirty) or (current_dirty == victim_dirty and frame < victim_frame):
-                        victim_frame = frame
-            return victim_frame
-        
-        elif self.algorithm == 'PER':
-            categories = [
-                (False, False),  # unreferenced, clean
-                (False, True),   # unreferenced, dirty
-                (True, False),   # referenced, clean
-                (True, True)     # referenced, dirty
-            ]
-            
-            for ref_bit, dirty_bit in categories:
-                min_frame = float('inf')
-                for frame, (pid, vpn) in enumerate(self.physical_memory):
-                    page = self.processes[pid].page_table[vpn]
-                    if page.referenced == ref_bit and page.dirty == dirty_bit:
-                        min_frame = min(min_frame, frame)
-                if min_frame != float('inf'):
-                    return min_frame
-            
-            return 0
+        return self.policy.select_victim()
 
     def reset_reference_bits(self) -> None:
-        for process in self.processes.values():
-            for page in process.page_table:
-                page.referenced = False
-
-def simulate(input_file: str, algorithm: str) -> SimulationResult:
-    system = MemorySystem(algorithm)
-    
-    with open(input_file, 'r') as f:
-        for line in f:
-            if line.strip():  # Skip empty lines
-                ref = MemoryReference.from_line(line)
-                system.handle_memory_access(ref)
-                
-                if algorithm == 'FIFO' and len(system.physical_memory) == system.PHYSICAL_PAGES:
-                    system.physical_memory = system.physical_memory[1:] + [system.physical_memory[0]]
+        self.epoch += 1
+
+def build_next_use(input_file: str, page_size: Optional[int] = None,
+                   index_file: Optional[str] = None) -> np.ndarray:
+    """Build OPT's next-use index with one reverse pass over the trace.
+
+    Entry i holds the position of the next reference to the same (pid, page)
+    as reference i, or the trace length if the page is never used again.
+    Text and compressed traces are converted to a temporary binary trace
+    first so they can be walked backwards chunk by chunk. For run traces only the entry of the
+    last reference in each run matters; the others point at the following
+    reference. With index_file the index is written to a .npy memory map
+    instead of being held in memory; without it, indexes of more than
+    OPT_INDEX_IN_MEMORY references are memory-mapped from a temporary file.
+    """
+    page_shift = (page_size or MemorySystem.PAGE_SIZE).bit_length() - 1
+    kind = trace_kind(input_file)
+    if input_file == STDIN:
+        raise ValueError("OPT needs the whole trace before simulating it; stage standard input "
+                         "to a file first (see stage_stdin)")
+    if kind in ('text', 'stream'):
+        with tempfile.TemporaryDirectory() as tmp:
+            binary_file = os.path.join(tmp, 'trace.bin')
+            convert_text_trace(input_file, binary_file, page_size or MemorySystem.PAGE_SIZE)
+            return build_next_use(binary_file, page_size, index_file)
+    
+    if kind == 'runs':
+        records, _ = load_run_trace(input_file)
+        ends = np.cumsum(records['count'], dtype=np.int64)
+        count = int(ends[-1]) if len(ends) else 0
+    else:
+        records = load_binary_trace(input_file)
+        count = len(records)
+    next_use = open_next_use(count, index_file)
     
+    if kind == 'runs':
+        next_run = np.empty(len(records), dtype=np.int64)
+        next_occurrence(records, page_shift, next_run)
+        for start in range(0, count, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, count)
+            next_use[start:stop] = np.arange(start + 1, stop + 1)
+        starts = np.append(ends - records['count'].astype(np.int64), count)
+        next_use[ends - 1] = starts[next_run]
+    else:
+        next_occurrence(records, page_shift, next_use)
+    
+    if isinstance(next_use, np.memmap):
+        next_use.flush()
+    return next_use
+
+def open_next_use(count: int, index_file: Optional[str] = None) -> np.ndarray:
+    if index_file:
+        return np.lib.format.open_memmap(index_file, mode='w+', dtype=np.int64, shape=(count,))
+    if count <= OPT_INDEX_IN_MEMORY:
+        return np.empty(count, dtype=np.int64)
+    # The file is unlinked straight away: the mapping stays valid and the
+    # space is freed once it is closed. (Windows refuses to unlink a mapped
+    # file; there it is left to the temp directory's cleanup.)
+    fd, path = tempfile.mkstemp(suffix='.npy')
+    os.close(fd)
+    next_use = np.lib.format.open_memmap(path, mode='w+', dtype=np.int64, shape=(count,))
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+    return next_use
+
+def stage_stdin(directory: str) -> str:
+    """Copy standard input, whatever its format, to a file in directory."""
+    path = os.path.join(directory, 'stdin.trace')
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(sys.stdin.buffer, f, 1 << 20)
+    return path
+
+def next_occurrence(records: np.ndarray, page_shift: int, out: np.ndarray) -> None:
+    """Store in out[i] the index of the next record for the same (pid, page).
+
+    Records whose page never comes back get len(records).
+    """
+    count = len(records)
+    page_ids: Dict[Tuple[int, int], int] = {}
+    last_seen = np.empty(0, dtype=np.int64)  # first position of each page after the current chunk
+    for start in reversed(range(0, count, CHUNK_SIZE)):
+        chunk = records[start:start + CHUNK_SIZE]
+        pages, inverse = np.unique(np.stack([chunk['pid'].astype(np.uint64), chunk['address'] >> np.uint64(page_shift)]),
+                                   axis=1, return_inverse=True)
+        chunk_ids = np.array([page_ids.setdefault(key, len(page_ids)) for key in zip(*pages.tolist())],
+                             dtype=np.int64)
+        ids = chunk_ids[inverse.reshape(-1)]
+        if len(page_ids) > len(last_seen):
+            last_seen = np.concatenate([last_seen, np.full(len(page_ids) - len(last_seen), count, dtype=np.int64)])
+        
+        # Sorting positions by page groups each page's references in order,
+        # so every reference's next use is simply the next entry in its group.
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        same_page = sorted_ids[:-1] == sorted_ids[1:]
+        result = np.empty(len(chunk), dtype=np.int64)
+        result[order[:-1][same_page]] = order[1:][same_page] + start
+        last = np.append(~same_page, True)
+        result[order[last]] = last_seen[sorted_ids[last]]
+        first = np.insert(~same_page, 0, True)
+        last_seen[sorted_ids[first]] = order[first] + start
+        out[start:start + len(chunk)] = result
+
+def current_rss() -> int:
+    """Resident set size in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+class ThroughputMonitor:
+    """Reports references/sec, faults/sec and RSS every interval seconds.
+
+    Time spent waiting for the next chunk (reading and decoding the trace) is
+    kept apart from time spent simulating it, so the split shows whether
+    ingest or simulation is the bottleneck. Reports happen between chunks.
+    """
+
+    def __init__(self, systems: List['MemorySystem'], interval: float, label: str = '', output=None):
+        self.systems = systems
+        self.interval = interval
+        self.label = label
+        self.output = output or sys.stderr
+        self.references = 0
+        self.ingest_time = 0.0
+        self.simulate_time = 0.0
+
+    def faults(self) -> int:
+        return sum(system.page_faults for system in self.systems)
+
+    def track(self, chunks: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
+        start = ready = time.perf_counter()
+        last = (start, 0, 0, 0.0, 0.0)  # time, references, faults, ingest, simulate
+        for chunk in chunks:
+            decoded = time.perf_counter()
+            self.ingest_time += decoded - ready
+            yield chunk
+            ready = time.perf_counter()
+            self.simulate_time += ready - decoded
+            self.references += int(chunk['count'].sum()) if chunk.dtype == RUN_DTYPE else len(chunk)
+            if ready - last[0] >= self.interval:
+                self.report(ready - start, ready - last[0], self.references - last[1], self.faults() - last[2],
+                            self.ingest_time - last[3], self.simulate_time - last[4])
+                last = (ready, self.references, self.faults(), self.ingest_time, self.simulate_time)
+        end = time.perf_counter()
+        self.report(end - start, end - start, self.references, self.faults(),
+                    self.ingest_time, self.simulate_time, done=True)
+
+    def report(self, elapsed: float, span: float, references: int, faults: int,
+               ingest: float, simulate: float, done: bool = False) -> None:
+        span = max(span, 1e-9)
+        busy = max(ingest + simulate, 1e-9)
+        prefix = f"[{self.label}] " if self.label else ''
+        print(f"{prefix}{'done' if done else 'progress'} {elapsed:.1f}s: "
+              f"{self.references:,} refs, {references / span:,.0f} refs/s, {faults / span:,.0f} faults/s, "
+              f"RSS {current_rss() / (1 << 20):.1f}MB, "
+              f"ingest {100 * ingest / busy:.0f}% / simulate {100 * simulate / busy:.0f}%",
+              file=self.output, flush=True)
+
+def make_result(system: MemorySystem, algorithm: str) -> SimulationResult:
     return SimulationResult(
         algorithm=algorithm,
         page_faults=system.page_faults,
@@ -177,24 +495,497 @@ def simulate(input_file: str, algorithm: str) -> SimulationResult:
         dirty_writes=system.dirty_writes
     )
 
+def system_options(input_file: str, algorithm: str, options: dict) -> dict:
+    """MemorySystem options, with OPT's next-use index built if needed.
+
+    An opt_index option names a .npy file to memory-map the index to.
+    """
+    options = dict(options)
+    index_file = options.pop('opt_index', None)
+    if algorithm.upper() == 'OPT' and options.get('next_use') is None:
+        options['next_use'] = build_next_use(input_file, options.get('page_size'), index_file)
+    return options
+
+def trace_chunks(input_file: str, page_size: Optional[int] = None, coalesce: bool = False,
+                 skip: int = 0) -> Iterator[np.ndarray]:
+    """Yield the chunks of any trace, coalesced into runs if asked.
+
+    A run trace, mapped or streamed, can only be replayed with its own page
+    size or a larger one, and its chunks are never coalesced again. The
+    first skip references are dropped before coalescing, which is how a
+    resumed run picks up at its checkpoint.
+    """
+    page_size = page_size or MemorySystem.PAGE_SIZE
+    chunks = iter_trace_chunks(input_file, page_size=page_size)
+    if skip:
+        chunks = skip_references(chunks, skip)
+    return coalesce_chunks(chunks, page_size) if coalesce else chunks
+
+def algorithm_path(path: str, algorithm: str) -> str:
+    """Per-algorithm output file name: tel.bin becomes tel.LRU.bin."""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{algorithm}{ext}"
+
+def start_telemetry(system: MemorySystem, algorithm: str, telemetry: Optional[str],
+                    window: int) -> Optional[TelemetryRecorder]:
+    if not telemetry:
+        return None
+    return TelemetryRecorder(system, algorithm_path(telemetry, algorithm), window)
+
+def resume_system(checkpoint: str, input_file: str, algorithm: str, options: dict) -> MemorySystem:
+    """Load a checkpointed MemorySystem and reattach OPT's next-use index."""
+    system = load_checkpoint(checkpoint)
+    if system.algorithm != algorithm.upper():
+        raise ValueError(f"{checkpoint} holds a {system.algorithm} run, not {algorithm}")
+    if system.algorithm == 'OPT':
+        next_use = build_next_use(input_file, system.page_size, options.get('opt_index'))
+        system.next_use = system.policy.next_use = next_use
+    return system
+
+def finish(system: MemorySystem, algorithm: str, recorder: Optional[TelemetryRecorder]) -> SimulationResult:
+    if recorder is not None:
+        recorder.close()
+    return make_result(system, algorithm)
+
+def simulate(input_file: str, algorithm: str, coalesce: bool = False, progress: Optional[float] = None,
+             telemetry: Optional[str] = None, telemetry_window: int = DEFAULT_WINDOW,
+             checkpoint: Optional[str] = None, checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+             resume: bool = False, positions: Optional[str] = None, **options) -> SimulationResult:
+    """Simulate one algorithm; options are passed on to MemorySystem.
+
+    With positions set, the trace is a --local shard and the file holds
+    each record's index in the whole trace (see shard_trace). With
+    progress set, throughput is reported every progress seconds. With
+    telemetry set, per-process time series are written to that path with
+    the algorithm name inserted (see algorithm_path). With checkpoint set,
+    the whole system is saved there every checkpoint_interval seconds, and
+    resume continues from an existing checkpoint instead of starting over.
+    """
+    if telemetry and checkpoint:
+        raise ValueError("telemetry cannot be combined with checkpoints")
+    if resume and checkpoint and os.path.exists(checkpoint):
+        system = resume_system(checkpoint, input_file, algorithm, options)
+    else:
+        system = MemorySystem(algorithm, **system_options(input_file, algorithm, options))
+    recorder = start_telemetry(system, algorithm, telemetry, telemetry_window)
+    checkpointer = Checkpointer(system, checkpoint, checkpoint_interval) if checkpoint else None
+    
+    # Accepts text, binary and run traces written by trace_io.py, standard
+    # input and compressed traces. A resumed system skips the references it
+    # has already simulated.
+    chunks = trace_chunks(input_file, system.page_size, coalesce, skip=system.time)
+    if progress:
+        chunks = ThroughputMonitor([system], progress, algorithm).track(chunks)
+    record_positions = np.memmap(positions, dtype=np.int64, mode='r') if positions else None
+    done = 0
+    for chunk in chunks:
+        system.run_chunk(chunk, None if record_positions is None else record_positions[done:done + len(chunk)])
+        done += len(chunk)
+        if checkpointer is not None:
+            checkpointer.maybe_save()
+    if checkpointer is not None:
+        checkpointer.wait()
+    
+    return finish(system, algorithm, recorder)
+
+def simulate_all(input_file: str, algorithms: List[str], coalesce: bool = False,
+                 progress: Optional[float] = None, telemetry: Optional[str] = None,
+                 telemetry_window: int = DEFAULT_WINDOW, **options) -> List[SimulationResult]:
+    """Run every algorithm over a single pass of the trace."""
+    systems = [MemorySystem(algorithm, **system_options(input_file, algorithm, options))
+               for algorithm in algorithms]
+    recorders = [start_telemetry(system, algorithm, telemetry, telemetry_window)
+                 for system, algorithm in zip(systems, algorithms)]
+    
+    # Each decoded chunk is replayed through every system before the next
+    # one is read, so the trace is parsed once no matter how many algorithms.
+    chunks = trace_chunks(input_file, options.get('page_size'), coalesce)
+    if progress:
+        chunks = ThroughputMonitor(systems, progress, ','.join(algorithms)).track(chunks)
+    for chunk in chunks:
+        for system in systems:
+            system.run_chunk(chunk)
+    
+    return [finish(system, algorithm, recorder)
+            for system, algorithm, recorder in zip(systems, algorithms, recorders)]
+
+def _simulate_shared(job: Tuple[str, str, str, str, int, dict]) -> SimulationResult:
+    input_file, algorithm, kind, source, count, options = job
+    coalesce = options.pop('coalesce', False)
+    progress = options.pop('progress', None)
+    telemetry = options.pop('telemetry', None)
+    telemetry_window = options.pop('telemetry_window', DEFAULT_WINDOW)
+    system = MemorySystem(algorithm, **system_options(input_file, algorithm, options))
+    recorder = start_telemetry(system, algorithm, telemetry, telemetry_window)
+    
+    def track(chunks: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
+        return ThroughputMonitor([system], progress, algorithm).track(chunks) if progress else chunks
+    
+    if kind == 'file':
+        for chunk in track(trace_chunks(source, options.get('page_size'), coalesce)):
+            system.run_chunk(chunk)
+    else:
+        shm = shared_memory.SharedMemory(name=source)
+        try:
+            # Shared records are runs when the trace was coalesced or was a run trace.
+            records = np.ndarray((count,), dtype=RUN_DTYPE if coalesce else RECORD_DTYPE, buffer=shm.buf)
+            chunk = None
+            for chunk in track(records[start:start + CHUNK_SIZE] for start in range(0, count, CHUNK_SIZE)):
+                system.run_chunk(chunk)
+            del records, chunk
+        finally:
+            shm.close()
+    
+    return finish(system, algorithm, recorder)
+
+def _run_shared(input_file: str, runs: List[Tuple[str, dict]], workers: int, coalesce: bool = False,
+                page_size: Optional[int] = None) -> List[SimulationResult]:
+    """Simulate each (algorithm, options) run in a worker process over one decoded trace.
+
+    Binary traces are memory-mapped by every worker, so they share the page
+    cache. Text and streamed traces are parsed (and coalesced) once into a
+    shared memory block.
+    """
+    if is_binary_trace(input_file):
+        with Pool(workers) as pool:
+            return pool.map(_simulate_shared, [(input_file, algorithm, 'file', input_file, 0,
+                                                {**options, 'coalesce': coalesce})
+                                               for algorithm, options in runs])
+    
+    chunks = list(trace_chunks(input_file, page_size, coalesce))
+    dtype = chunks[0].dtype if chunks else RECORD_DTYPE  # streamed run traces are runs too
+    count = sum(len(chunk) for chunk in chunks)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, count * dtype.itemsize))
+    try:
+        records = np.ndarray((count,), dtype=dtype, buffer=shm.buf)
+        start = 0
+        for chunk in chunks:
+            records[start:start + len(chunk)] = chunk
+            start += len(chunk)
+        del chunks, records
+        
+        with Pool(workers) as pool:
+            return pool.map(_simulate_shared, [(input_file, algorithm, 'shm', shm.name, count,
+                                                {**options, 'coalesce': dtype == RUN_DTYPE})
+                                               for algorithm, options in runs])
+    finally:
+        shm.close()
+        shm.unlink()
+
+def simulate_parallel(input_file: str, algorithms: List[str], workers: int, coalesce: bool = False,
+                      progress: Optional[float] = None, telemetry: Optional[str] = None,
+                      telemetry_window: int = DEFAULT_WINDOW, **options) -> List[SimulationResult]:
+    """Run each algorithm in its own worker process over one decoded trace."""
+    options = {**options, 'progress': progress, 'telemetry': telemetry, 'telemetry_window': telemetry_window}
+    return _run_shared(input_file, [(algorithm, options) for algorithm in algorithms], workers,
+                       coalesce, options.get('page_size'))
+
+def simulate_replicas(input_file: str, replicas: int, workers: int, seed: int = 0, coalesce: bool = False,
+                      **options) -> List[SimulationResult]:
+    """Run independent RAND replicas, each with its own seeded RNG.
+
+    Replica seeds are spawned from one SeedSequence, so the same seed always
+    gives the same set of results, however many workers run them.
+    """
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(replicas)]
+    return _run_shared(input_file, [('RAND', {**options, 'seed': replica_seed}) for replica_seed in seeds],
+                       workers, coalesce, options.get('page_size'))
+
+def regularized_beta(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b), by Lentz's continued fraction."""
+    if x <= 0 or x >= 1:
+        return 0.0 if x <= 0 else 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - regularized_beta(b, a, 1 - x)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log1p(-x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    total = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            total *= c * d
+        if abs(c * d - 1.0) < 1e-15:
+            break
+    return front * total
+
+def student_t_quantile(p: float, df: int) -> float:
+    """Inverse CDF of Student's t distribution with df degrees of freedom, for p >= 0.5.
+
+    Bisects the CDF 1 - I_{df/(df+t^2)}(df/2, 1/2) / 2; the bracket starts
+    at the normal quantile, which the t quantile always exceeds.
+    """
+    def cdf(t: float) -> float:
+        return 1.0 - 0.5 * regularized_beta(df / 2, 0.5, df / (df + t * t))
+    low = NormalDist().inv_cdf(p)
+    high = max(2 * low, 1.0)
+    while cdf(high) < p:
+        low, high = high, 2 * high
+    for _ in range(100):
+        middle = (low + high) / 2
+        if cdf(middle) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+def summarize_replicas(results: List[SimulationResult], confidence: float = 0.95) -> List[ReplicaStats]:
+    """Mean, sample standard deviation and Student-t confidence interval per metric.
+
+    The interval uses the t quantile with N - 1 degrees of freedom, which
+    matters for the handful of replicas a run usually has; with one replica
+    the interval is just the mean.
+    """
+    t = student_t_quantile((1 + confidence) / 2, len(results) - 1) if len(results) > 1 else 0.0
+    stats = []
+    for metric in ['page_faults', 'disk_references', 'dirty_writes']:
+        values = np.array([getattr(result, metric) for result in results], dtype=np.float64)
+        mean = float(values.mean())
+        std = float(values.std(ddof=1)) if len(values) > 1 else 0.0
+        margin = t * std / math.sqrt(len(values))
+        stats.append(ReplicaStats(metric, mean, std, mean - margin, mean + margin, confidence))
+    return stats
+
+def shard_trace(input_file: str, directory: str, page_size: Optional[int] = None,
+                coalesce: bool = False) -> Dict[int, Tuple[str, str, int]]:
+    """Split a trace into one binary trace per process in directory.
+
+    Returns pid -> (shard path, positions path, number of distinct pages
+    the process touches). The positions file holds the index in the whole
+    trace of each shard record, as raw int64, so a shard can be replayed on
+    the trace's own clock. Run traces, and traces coalesced here, are split
+    into run traces. Records are buffered and appended to the shards
+    SHARD_BUFFER at a time, so only one shard file is open at once however
+    many processes the trace has.
+    """
+    page_size = page_size or MemorySystem.PAGE_SIZE
+    page_shift = np.uint64(page_size.bit_length() - 1)
+    paths: Dict[int, Tuple[str, str]] = {}
+    pages: Dict[int, Set[int]] = {}
+    buffers: Dict[int, List[Tuple[np.ndarray, np.ndarray]]] = {}
+    buffered = 0
+    run_page_size = None
+    
+    def flush() -> None:
+        for pid, parts in buffers.items():
+            shard_file, positions_file = paths[pid]
+            with BinaryTraceWriter(shard_file, run_page_size, append=os.path.exists(shard_file)) as writer:
+                for part, _ in parts:
+                    writer.write(part)
+            with open(positions_file, 'ab') as f:
+                for _, part_positions in parts:
+                    f.write(part_positions.tobytes())
+        buffers.clear()
+    
+    clock = 0
+    for chunk in trace_chunks(input_file, page_size, coalesce):
+        counts = chunk['count'].astype(np.int64) if chunk.dtype == RUN_DTYPE else np.ones(len(chunk), dtype=np.int64)
+        ends = clock + np.cumsum(counts)
+        positions = ends - counts
+        clock = int(ends[-1]) if len(ends) else clock
+        # A run trace was checked against page_size, so its runs are runs at that page size too.
+        run_page_size = page_size if chunk.dtype == RUN_DTYPE else None
+        
+        order = np.argsort(chunk['pid'], kind='stable')
+        grouped = chunk[order]
+        pids, starts = np.unique(grouped['pid'], return_index=True)
+        for pid, part, part_positions in zip(pids.tolist(), np.split(grouped, starts[1:]),
+                                             np.split(positions[order], starts[1:])):
+            if pid not in paths:
+                paths[pid] = (os.path.join(directory, f"pid_{pid}.bin"), os.path.join(directory, f"pid_{pid}.pos"))
+                pages[pid] = set()
+            buffers.setdefault(pid, []).append((part, part_positions))
+            pages[pid].update(np.unique(part['address'] >> page_shift).tolist())
+        buffered += len(chunk)
+        if buffered >= SHARD_BUFFER:
+            flush()
+            buffered = 0
+    flush()
+    return {pid: (*paths[pid], len(pages[pid])) for pid in paths}
+
+def frame_quotas(pages_touched: Dict[int, int], physical_pages: int, quota: Optional[int] = None) -> Dict[int, int]:
+    """Frames for each process under local replacement.
+
+    With quota every process gets that many frames. Otherwise physical_pages
+    is split in proportion to the pages each process touches (largest
+    remainder rounding, at least one frame each).
+    """
+    pids = sorted(pages_touched)
+    if quota:
+        return {pid: quota for pid in pids}
+    if len(pids) > physical_pages:
+        raise ValueError(f"{len(pids)} processes cannot share {physical_pages} frames")
+    
+    total = sum(pages_touched.values())
+    shares = {pid: physical_pages * pages_touched[pid] / total for pid in pids}
+    quotas = {pid: max(1, int(shares[pid])) for pid in pids}
+    by_remainder = sorted(pids, key=lambda pid: (int(shares[pid]) - shares[pid], pid))
+    for pid in by_remainder[:max(0, physical_pages - sum(quotas.values()))]:
+        quotas[pid] += 1
+    # Minimum one-frame quotas can overshoot; take the excess from the largest.
+    while sum(quotas.values()) > physical_pages:
+        quotas[max(pids, key=lambda pid: (quotas[pid], -pid))] -= 1
+    return quotas
+
+def _simulate_shard(job: Tuple[str, str, str, int, dict]) -> SimulationResult:
+    shard_file, positions_file, algorithm, frames, options = job
+    return simulate(shard_file, algorithm, positions=positions_file, **{**options, 'physical_pages': frames})
+
+def shard_options(options: dict, pid: int) -> dict:
+    # Shards run side by side, so each needs its own OPT index file.
+    if options.get('opt_index'):
+        return {**options, 'opt_index': algorithm_path(options['opt_index'], f"pid{pid}")}
+    return options
+
+def simulate_local(input_file: str, algorithms: List[str], workers: int, quota: Optional[int] = None,
+                   **options) -> Tuple[List[SimulationResult], Dict[int, int]]:
+    """Local replacement: every process replaces pages only within its own frames.
+
+    Processes then never affect each other, so the trace is split by pid and
+    every (algorithm, process) pair runs as its own job across workers, and
+    the totals are summed. Every shard is replayed on the whole trace's
+    clock, skipping the other processes' references, so PER's reset
+    interval and FIFO's cursor count the same references as under global
+    replacement. The trace is coalesced, if asked, before it is split.
+    Returns the merged results and the frame quota of each process.
+    """
+    physical_pages = options.get('physical_pages') or MemorySystem.PHYSICAL_PAGES
+    coalesce = options.pop('coalesce', False)
+    with tempfile.TemporaryDirectory() as tmp:
+        shards = shard_trace(input_file, tmp, options.get('page_size'), coalesce)
+        quotas = frame_quotas({pid: pages for pid, (_, _, pages) in shards.items()}, physical_pages, quota)
+        jobs = [(shards[pid][0], shards[pid][1], algorithm, quotas[pid], shard_options(options, pid))
+                for algorithm in algorithms for pid in sorted(shards)]
+        with Pool(workers) as pool:
+            shard_results = pool.map(_simulate_shard, jobs)
+    
+    results = []
+    for i, algorithm in enumerate(algorithms):
+        per_process = shard_results[i * len(shards):(i + 1) * len(shards)]
+        results.append(SimulationResult(
+            algorithm=f"{algorithm} (local)",
+            page_faults=sum(result.page_faults for result in per_process),
+            disk_references=sum(result.disk_references for result in per_process),
+            dirty_writes=sum(result.dirty_writes for result in per_process)
+        ))
+    return results, quotas
+
+def format_size(size: int) -> str:
+    for unit in ['bytes', 'KB', 'MB', 'GB', 'TB', 'PB']:
+        if size < 1024 or size % 1024 or unit == 'PB':
+            return f"{size} {unit}" if unit == 'bytes' else f"{size}{unit}"
+        size //= 1024
+
 def main():
     parser = argparse.ArgumentParser(description='Virtual Memory Simulator')
-    parser.add_argument('input_file', help='Path to the input file containing memory references')
+    parser.add_argument('input_file', help='Path to the input file containing memory references (text, binary or '
+                      'run trace, optionally gzip or zstd compressed), or "-" to read standard input')
     parser.add_argument('--algorithms', nargs='+', 
-                      choices=['RAND', 'FIFO', 'LRU', 'PER'],
-                      default=['RAND', 'FIFO', 'LRU', 'PER'],
+                      choices=ALGORITHMS,
+                      default=DEFAULT_ALGORITHMS,
                       help='Page replacement algorithms to simulate')
+    parser.add_argument('--single-pass', action='store_true',
+                      help='Simulate all algorithms together in one pass over the trace')
+    parser.add_argument('--workers', type=int, default=1,
+                      help='Run the algorithms in this many worker processes sharing one decoded trace')
+    parser.add_argument('--page-size', type=int, default=MemorySystem.PAGE_SIZE,
+                      help='Page size in bytes (power of two)')
+    parser.add_argument('--physical-pages', type=int, default=MemorySystem.PHYSICAL_PAGES,
+                      help='Physical memory size in frames')
+    parser.add_argument('--address-bits', type=int, default=MemorySystem.VIRTUAL_ADDRESS_BITS,
+                      help='Width of each process\'s virtual address space in bits (up to 48 for real traces)')
+    parser.add_argument('--coalesce', action='store_true',
+                      help='Replay back-to-back references to the same page as single runs')
+    parser.add_argument('--progress', type=float, metavar='SECONDS',
+                      help='Report references/sec, faults/sec and RSS on stderr at this interval')
+    parser.add_argument('--telemetry', metavar='PATH',
+                      help='Write per-process fault rate, resident pages and working-set size per window '
+                      'to PATH, with the algorithm name inserted before the extension')
+    parser.add_argument('--telemetry-window', type=int, default=DEFAULT_WINDOW,
+                      help='References per telemetry window')
+    parser.add_argument('--local', action='store_true',
+                      help='Local replacement: split memory between processes and simulate each process '
+                      'separately across --workers processes')
+    parser.add_argument('--quota', type=int,
+                      help='With --local, frames per process (default: physical memory split in '
+                      'proportion to the pages each process touches)')
+    parser.add_argument('--checkpoint', metavar='PATH',
+                      help='Save the simulation state periodically to PATH, with the algorithm name inserted '
+                      'before the extension')
+    parser.add_argument('--checkpoint-interval', type=float, default=DEFAULT_CHECKPOINT_INTERVAL,
+                      help='Seconds between checkpoints')
+    parser.add_argument('--resume', action='store_true',
+                      help='Continue from existing --checkpoint files instead of starting over')
+    parser.add_argument('--opt-index', metavar='PATH',
+                      help='Memory-map OPT\'s next-use index (8 bytes per reference) to this .npy file; '
+                      f'by default it is kept in RAM up to {OPT_INDEX_IN_MEMORY:,} references and '
+                      'memory-mapped from a temporary file beyond that')
+    parser.add_argument('--seed', type=int,
+                      help='Seed for RAND\'s random number generator')
+    parser.add_argument('--replicas', type=int,
+                      help='Run this many seeded RAND replicas (across --workers processes) and report '
+                      'the mean, standard deviation and confidence interval of each result')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                      help='Confidence level of the --replicas intervals (Student-t, N - 1 degrees of freedom)')
     
     args = parser.parse_args()
+    if args.checkpoint and (args.local or args.single_pass or args.workers > 1 or args.telemetry
+                            or (args.input_file == STDIN and len(args.algorithms) > 1)):
+        parser.error('--checkpoint only works for sequential runs without --telemetry')
+    if args.resume and not args.checkpoint:
+        parser.error('--resume needs --checkpoint')
+    options = {'page_size': args.page_size, 'address_bits': args.address_bits,
+               'physical_pages': args.physical_pages}
+    system = MemorySystem('LRU', **options)  # validates the options
+    options.update(coalesce=args.coalesce, progress=args.progress, opt_index=args.opt_index)
+    
+    # OPT has to see the whole trace before simulating it, so standard input
+    # is staged to a temporary file, as compressed traces are.
+    staging = None
+    if args.input_file == STDIN and 'OPT' in args.algorithms:
+        staging = tempfile.TemporaryDirectory()
+        args.input_file = stage_stdin(staging.name)
     
     print(f"\nRunning simulation with input file: {args.input_file}")
-    print("Page size: 512 bytes")
-    print("Physical memory size: 16KB (32 pages)")
-    print("Virtual address space per process: 64KB (128 pages)\n")
+    print(f"Page size: {system.page_size} bytes")
+    print(f"Physical memory size: {format_size(system.physical_pages * system.page_size)} ({system.physical_pages} pages)")
+    print(f"Virtual address space per process: {format_size(1 << system.address_bits)} ({system.pages_per_process} pages)\n")
+    
+    algorithms = args.algorithms
+    if args.replicas:
+        algorithms = [algorithm for algorithm in algorithms if algorithm != 'RAND']
+        replicas = simulate_replicas(args.input_file, args.replicas, args.workers, args.seed or 0, **options)
+        print(f"\nRAND Algorithm Results over {args.replicas} replicas:")
+        for stats in summarize_replicas(replicas, args.confidence):
+            print(stats)
+    options.update(seed=args.seed, telemetry=args.telemetry, telemetry_window=args.telemetry_window)
+    
+    if args.local:
+        if args.telemetry:
+            parser.error('--telemetry is not supported with --local')
+        results, quotas = simulate_local(args.input_file, algorithms, args.workers, args.quota, **options)
+        print("Frame quotas: " + ", ".join(f"pid {pid}: {frames}" for pid, frames in quotas.items()))
+    elif args.workers > 1:
+        results = simulate_parallel(args.input_file, algorithms, args.workers, **options)
+    elif args.single_pass or (args.input_file == STDIN and len(algorithms) > 1):  # stdin can only be read once
+        results = simulate_all(args.input_file, algorithms, **options)
+    elif args.checkpoint:
+        results = (simulate(args.input_file, algorithm, checkpoint=algorithm_path(args.checkpoint, algorithm),
+                            checkpoint_interval=args.checkpoint_interval, resume=args.resume, **options)
+                   for algorithm in algorithms)
+    else:
+        results = (simulate(args.input_file, algorithm, **options) for algorithm in algorithms)
     
-    for algorithm in args.algorithms:
-        result = simulate(args.input_file, algorithm)
+    for result in results:
         print(result)
+    if staging is not None:
+        staging.cleanup()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,510 @@
+from collections import OrderedDict
+import heapq
+import random
+from typing import Dict, List, Optional, Tuple, Type
+
+POLICIES: Dict[str, Type['ReplacementPolicy']] = {}
+
+
+def register_policy(cls: Type['ReplacementPolicy']) -> Type['ReplacementPolicy']:
+    """Class decorator adding a policy to POLICIES under its name."""
+    POLICIES[cls.name] = cls
+    return cls
+
+
+class ReplacementPolicy:
+    """Base class for page replacement policies.
+
+    MemorySystem calls select_victim() when a fault finds memory full, plus
+    the optional hooks below. A hook left as None costs nothing on the
+    per-reference path, so policies only define the ones they need:
+
+    - on_access(frame, faulted, first_reference, dirty): after every
+      reference, once the page is resident in frame and its bits are updated.
+      first_reference is True for the first reference since the last tick.
+      A coalesced run of hits to one page is delivered as a single call, so
+      the hook must give the same state for one repeated hit as for many.
+    - on_fault(pid, page_number): when a fault starts, before any victim is
+      chosen.
+    - on_evict(frame, pid, page_number): after the victim page leaves frame.
+    - tick(): every MemorySystem.reset_interval references.
+    """
+    name = ''
+    on_access = None
+    on_fault = None
+    on_evict = None
+    tick = None
+
+    def __init__(self, system):
+        self.system = system
+        self.capacity = system.physical_pages
+
+    def select_victim(self) -> int:
+        raise NotImplementedError
+
+
+@register_policy
+class RandomPolicy(ReplacementPolicy):
+    name = 'RAND'
+
+    def __init__(self, system):
+        super().__init__(system)
+        # Without a seed, victims come from the global random module.
+        self.randrange = random.randrange if system.seed is None else random.Random(system.seed).randrange
+
+    def select_victim(self) -> int:
+        return self.randrange(self.capacity)
+
+
+@register_policy
+class FIFOPolicy(ReplacementPolicy):
+    """Circular eviction cursor over the frames.
+
+    The old list rotation moved the cursor once per reference from the
+    moment memory filled up, so the cursor is just the number of references
+    since then, modulo the frame count. Deriving it from the clock keeps
+    FIFO off the hit path entirely.
+    """
+    name = 'FIFO'
+
+    def __init__(self, system):
+        super().__init__(system)
+        self.full_time: Optional[int] = None
+
+    def on_fault(self, pid: int, page_number: int) -> None:
+        if self.full_time is None and len(self.system.physical_memory) == self.capacity - 1:
+            self.full_time = self.system.time  # this fault fills the last free frame
+
+    def select_victim(self) -> int:
+        return (self.system.time - self.full_time) % self.capacity
+
+
+@register_policy
+class LRUPolicy(ReplacementPolicy):
+    """Resident frames ordered from least to most recently used.
+
+    Access times are unique, so the LRU end is always the victim and the old
+    clean-before-dirty / lowest-frame tie-breaks can never trigger.
+    """
+    name = 'LRU'
+
+    def __init__(self, system):
+        super().__init__(system)
+        self.order: 'OrderedDict[int, None]' = OrderedDict()
+
+    def on_access(self, frame: int, faulted: bool, first_reference: bool, dirty: int) -> None:
+        if faulted:
+            self.order[frame] = None
+        self.order.move_to_end(frame)
+
+    def select_victim(self) -> int:
+        # The frame keeps its slot in order; the faulting access moves it to
+        # the most recently used end.
+        return next(iter(self.order))
+
+
+@register_policy
+class PERPolicy(ReplacementPolicy):
+    """Page replacement with aging.
+
+    Reference bits are epochs: tick() resets them by bumping
+    MemorySystem.epoch. Each (referenced, dirty) category keeps a min-heap of
+    frames, validated lazily, so the lowest frame is found without a scan.
+    Frames referenced during an epoch are collected in touched; tick() moves
+    them to expired, at most once per frame however many epochs pass without
+    a fault, and they join the unreferenced heaps before the next victim is
+    chosen.
+    """
+    name = 'PER'
+
+    def __init__(self, system):
+        super().__init__(system)
+        self.heaps: List[List[int]] = [[], [], [], []]
+        self.queued = [bytearray(self.capacity) for _ in range(4)]
+        self.touched: List[int] = []
+        self.expired: List[int] = []
+        self.is_expired = bytearray(self.capacity)
+
+    def on_access(self, frame: int, faulted: bool, first_reference: bool, dirty: int) -> None:
+        if faulted or first_reference:
+            self.touched.append(frame)
+        self.enqueue(frame, 2 + dirty)
+
+    def tick(self) -> None:
+        self.system.reset_reference_bits()
+        is_expired = self.is_expired
+        for frame in self.touched:
+            if not is_expired[frame]:
+                is_expired[frame] = 1
+                self.expired.append(frame)
+        self.touched = []
+
+    def select_victim(self) -> int:
+        # Frames referenced in earlier epochs are now unreferenced.
+        is_expired = self.is_expired
+        for frame in self.expired:
+            is_expired[frame] = 0
+            self.enqueue(frame, self.category(frame))
+        self.expired.clear()
+
+        # Categories in order: unreferenced clean, unreferenced dirty,
+        # referenced clean, referenced dirty. Entries whose frame has since
+        # changed category are dropped as they surface.
+        for category, heap in enumerate(self.heaps):
+            queued = self.queued[category]
+            while heap:
+                frame = heap[0]
+                if self.category(frame) == category:
+                    return frame
+                heapq.heappop(heap)
+                queued[frame] = 0
+
+        return 0
+
+    def category(self, frame: int) -> int:
+        system = self.system
+        pid, vpn = system.physical_memory[frame]
+        table = system.processes[pid].page_table
+        slot = table.index[vpn]
+        return 2 * (table.reference_epoch[slot] == system.epoch) + table.dirty[slot]
+
+    def enqueue(self, frame: int, category: int) -> None:
+        queued = self.queued[category]
+        if not queued[frame]:
+            queued[frame] = 1
+            heapq.heappush(self.heaps[category], frame)
+
+
+@register_policy
+class OPTPolicy(ReplacementPolicy):
+    """Belady's optimal replacement.
+
+    system.next_use[i] is the index of the next reference to the page
+    referenced at index i (see mem_sim.build_next_use). Frames sit in a
+    max-heap on their page's next use, validated lazily against frame_next
+    and rebuilt when stale entries pile up.
+    """
+    name = 'OPT'
+
+    def __init__(self, system):
+        super().__init__(system)
+        if system.next_use is None:
+            raise ValueError("OPT needs the trace's next-use index")
+        self.next_use = system.next_use
+        self.frame_next: List[int] = []
+        self.heap: List[Tuple[int, int]] = []
+
+    def __getstate__(self) -> dict:
+        # The index is rebuilt from the trace on resume (see mem_sim.resume_system).
+        return {**self.__dict__, 'next_use': None}
+
+    def on_access(self, frame: int, faulted: bool, first_reference: bool, dirty: int) -> None:
+        # The index only covers the system's own references (see MemorySystem.skip).
+        next_use = int(self.next_use[self.system.time - self.system.skipped - 1])
+        if frame == len(self.frame_next):
+            self.frame_next.append(next_use)
+        else:
+            self.frame_next[frame] = next_use
+        heapq.heappush(self.heap, (-next_use, frame))
+        if len(self.heap) > 2 * self.capacity + 64:
+            self.heap = [(-value, f) for f, value in enumerate(self.frame_next)]
+            heapq.heapify(self.heap)
+
+    def select_victim(self) -> int:
+        heap = self.heap
+        while True:
+            neg_next, frame = heap[0]
+            if self.frame_next[frame] == -neg_next:
+                return frame
+            heapq.heappop(heap)
+
+
+@register_policy
+class ClockPolicy(ReplacementPolicy):
+    """CLOCK (second chance): one reference bit per frame and a sweeping hand."""
+    name = 'CLOCK'
+
+    def __init__(self, system):
+        super().__init__(system)
+        self.referenced = bytearray(self.capacity)
+        self.hand = 0
+
+    def on_access(self, frame: int, faulted: bool, first_reference: bool, dirty: int) -> None:
+        self.referenced[frame] = 1
+
+    def select_victim(self) -> int:
+        referenced = self.referenced
+        hand = self.hand
+        while referenced[hand]:
+            referenced[hand] = 0
+            hand = (hand + 1) % self.capacity
+        self.hand = (hand + 1) % self.capacity
+        return hand
+
+
+@register_policy
+class ARCPolicy(ReplacementPolicy):
+    """Adaptive Replacement Cache (Megiddo and Modha, FAST 2003).
+
+    t1 and t2 hold resident frames seen once and at least twice, in LRU
+    order; b1 and b2 are their ghost lists of recently evicted (pid, page)
+    keys. Hits in the ghost lists move the target size p of t1. Every step is
+    O(1): hits only touch the frame's OrderedDict entry, and ghost keys are
+    only built on faults.
+    """
+    name = 'ARC'
+
+    def __init__(self, system):
+        super().__init__(system)
+        self.p = 0.0
+        self.t1: 'OrderedDict[int, None]' = OrderedDict()
+        self.t2: 'OrderedDict[int, None]' = OrderedDict()
+        self.b1: 'OrderedDict[Tuple[int, int], None]' = OrderedDict()
+        self.b2: 'OrderedDict[Tuple[int, int], None]' = OrderedDict()
+        # Decisions taken in on_fault for the page being brought in
+        self.insert_into = self.t1
+        self.ghost_hit_b2 = False
+        self.drop_from_t1 = False
+        self.evict_to: Optional['OrderedDict[Tuple[int, int], None]'] = None
+
+    def on_fault(self, pid: int, page_number: int) -> None:
+        key = (pid, page_number)
+        c = self.capacity
+        t1, b1, b2 = self.t1, self.b1, self.b2
+        self.ghost_hit_b2 = False
+        self.drop_from_t1 = False
+        if key in b1:
+            self.p = min(c, self.p + max(len(b2) / len(b1), 1))
+            del b1[key]
+            self.insert_into = self.t2
+        elif key in b2:
+            self.p = max(0.0, self.p - max(len(b1) / len(b2), 1))
+            del b2[key]
+            self.insert_into = self.t2
+            self.ghost_hit_b2 = True
+        else:
+            self.insert_into = t1
+            if len(t1) + len(b1) == c:
+                if len(t1) < c:
+                    b1.popitem(last=False)
+                else:
+                    self.drop_from_t1 = True
+            elif len(t1) + len(self.t2) + len(b1) + len(b2) >= 2 * c:
+                b2.popitem(last=False)
+
+    def select_victim(self) -> int:
+        t1 = self.t1
+        if self.drop_from_t1:
+            self.evict_to = None
+            return next(iter(t1))
+        if t1 and (len(t1) > self.p or (self.ghost_hit_b2 and len(t1) == self.p)):
+            self.evict_to = self.b1
+            return next(iter(t1))
+        self.evict_to = self.b2
+        return next(iter(self.t2))
+
+    def on_evict(self, frame: int, pid: int, page_number: int) -> None:
+        if frame in self.t1:
+            del self.t1[frame]
+        else:
+            del self.t2[frame]
+        if self.evict_to is not None:
+            self.evict_to[(pid, page_number)] = None
+
+    def on_access(self, frame: int, faulted: bool, first_reference: bool, dirty: int) -> None:
+        if faulted:
+            self.insert_into[frame] = None
+        elif frame in self.t2:
+            self.t2.move_to_end(frame)
+        else:
+            del self.t1[frame]
+            self.t2[frame] = None
+
+
+class _ClockProPage:
+    __slots__ = ('key', 'frame', 'status', 'referenced', 'prev', 'next')
+
+    def __init__(self, key: Tuple[int, int], frame: int, status: int):
+        self.key = key
+        self.frame = frame
+        self.status = status
+        self.referenced = False
+        self.prev = self
+        self.next = self
+
+
+@register_policy
+class ClockProPolicy(ReplacementPolicy):
+    """CLOCK-Pro (Jiang, Chen and Zhang, USENIX ATC 2005).
+
+    Resident hot and cold pages and non-resident test pages share one clock.
+    Three hands sweep it: the cold hand finds victims and promotes re-used
+    cold pages, the hot hand demotes hot pages, and the test hand retires
+    test pages. cold_target adapts to re-references of test pages. This
+    follows the common simplified formulation where every resident cold page
+    is in its test period.
+
+    One departure keeps the policy compatible with MemorySystem, which frees
+    exactly one frame per fault: the test hand never triggers a nested cold
+    hand run, it simply passes the cold hand.
+    """
+    name = 'CLOCK-PRO'
+    HOT, COLD, TEST = 0, 1, 2
+
+    def __init__(self, system):
+        super().__init__(system)
+        self.pages: Dict[Tuple[int, int], _ClockProPage] = {}
+        self.frame_pages: List[Optional[_ClockProPage]] = [None] * self.capacity
+        self.hand_hot: Optional[_ClockProPage] = None
+        self.hand_cold: Optional[_ClockProPage] = None
+        self.hand_test: Optional[_ClockProPage] = None
+        self.count_hot = 0
+        self.count_cold = 0
+        self.count_test = 0
+        self.cold_target = self.capacity
+        # Set in on_fault for the page being brought in
+        self.incoming_key: Tuple[int, int] = (0, 0)
+        self.incoming_hot = False
+        self.victim_frame: Optional[int] = None
+
+    def __getstate__(self) -> dict:
+        # Pickle follows the ring's prev/next links recursively, which
+        # overflows the stack past about a hundred pages, so the ring is
+        # stored as a flat list in clock order from the hot hand instead.
+        state = dict(self.__dict__)
+        ring = []
+        page = self.hand_hot
+        while page is not None:
+            ring.append(page)
+            page = page.next
+            if page is self.hand_hot:
+                break
+        position = {id(page): i for i, page in enumerate(ring)}
+        state['ring'] = [(page.key, page.frame, page.status, page.referenced) for page in ring]
+        state['frame_pages'] = [None if page is None else position[id(page)] for page in self.frame_pages]
+        for hand in ('hand_hot', 'hand_cold', 'hand_test'):
+            state[hand] = None if state[hand] is None else position[id(state[hand])]
+        del state['pages']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        ring = []
+        for key, frame, status, referenced in state.pop('ring'):
+            page = _ClockProPage(key, frame, status)
+            page.referenced = referenced
+            if ring:
+                page.prev = ring[-1]
+                ring[-1].next = page
+            ring.append(page)
+        if ring:
+            ring[0].prev = ring[-1]
+            ring[-1].next = ring[0]
+        self.__dict__.update(state)
+        self.pages = {page.key: page for page in ring}
+        self.frame_pages = [None if i is None else ring[i] for i in state['frame_pages']]
+        for hand in ('hand_hot', 'hand_cold', 'hand_test'):
+            setattr(self, hand, None if state[hand] is None else ring[state[hand]])
+
+    def on_fault(self, pid: int, page_number: int) -> None:
+        key = (pid, page_number)
+        self.incoming_key = key
+        page = self.pages.get(key)
+        self.incoming_hot = page is not None
+        if page is not None:
+            # Re-referenced during its test period: give cold pages more room
+            if self.cold_target < self.capacity:
+                self.cold_target += 1
+            self.remove(page)
+            self.count_test -= 1
+
+    def select_victim(self) -> int:
+        self.victim_frame = None
+        while self.victim_frame is None:
+            self.run_hand_cold()
+        return self.victim_frame
+
+    def on_access(self, frame: int, faulted: bool, first_reference: bool, dirty: int) -> None:
+        if not faulted:
+            self.frame_pages[frame].referenced = True
+            return
+        status = self.HOT if self.incoming_hot else self.COLD
+        page = _ClockProPage(self.incoming_key, frame, status)
+        if self.incoming_hot:
+            self.count_hot += 1
+        else:
+            self.count_cold += 1
+        self.pages[page.key] = page
+        self.frame_pages[frame] = page
+        self.insert(page)
+
+    def insert(self, page: _ClockProPage) -> None:
+        # New pages go at the list head, just behind the hot hand
+        if self.hand_hot is None:
+            self.hand_hot = self.hand_cold = self.hand_test = page
+            return
+        head = self.hand_hot
+        page.prev = head.prev
+        page.next = head
+        head.prev.next = page
+        head.prev = page
+        if self.hand_cold is self.hand_hot:
+            self.hand_cold = page
+        if self.hand_test is self.hand_hot:
+            self.hand_test = page
+
+    def remove(self, page: _ClockProPage) -> None:
+        del self.pages[page.key]
+        if page.next is page:
+            self.hand_hot = self.hand_cold = self.hand_test = None
+            return
+        if page is self.hand_hot:
+            self.hand_hot = page.prev
+        if page is self.hand_cold:
+            self.hand_cold = page.prev
+        if page is self.hand_test:
+            self.hand_test = page.prev
+        page.prev.next = page.next
+        page.next.prev = page.prev
+
+    def run_hand_cold(self) -> None:
+        page = self.hand_cold
+        if page.status == self.COLD:
+            if page.referenced:
+                page.status = self.HOT
+                page.referenced = False
+                self.count_cold -= 1
+                self.count_hot += 1
+            else:
+                # Evict, but remember the page while its test period runs
+                page.status = self.TEST
+                self.frame_pages[page.frame] = None
+                self.victim_frame = page.frame
+                self.count_cold -= 1
+                self.count_test += 1
+                while self.count_test > self.capacity:
+                    self.run_hand_test()
+        self.hand_cold = self.hand_cold.next
+        while self.capacity - self.cold_target < self.count_hot:
+            self.run_hand_hot()
+
+    def run_hand_hot(self) -> None:
+        if self.hand_hot is self.hand_test:
+            self.run_hand_test()
+        page = self.hand_hot
+        if page.status == self.HOT:
+            if page.referenced:
+                page.referenced = False
+            else:
+                page.status = self.COLD
+                self.count_hot -= 1
+                self.count_cold += 1
+        self.hand_hot = self.hand_hot.next
+
+    def run_hand_test(self) -> None:
+        page = self.hand_test
+        if page.status == self.TEST:
+            self.remove(page)
+            self.count_test -= 1
+            if self.cold_target > 1:
+                self.cold_target -= 1
+        self.hand_test = self.hand_test.next
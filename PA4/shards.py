@@ -0,0 +1,295 @@
+import argparse
+import csv
+import heapq
+import os
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from mem_sim import ALGORITHMS, MemorySystem, simulate, simulate_all, trace_chunks
+from stack_distance import StackDistanceAnalyzer, analyze
+from trace_io import RUN_DTYPE, BinaryTraceWriter
+
+# A (pid, page) key is sampled when the low HASH_BITS bits of its hash fall
+# below the threshold, so the sampling rate is threshold / HASH_MODULUS and
+# every reference to a sampled page is kept.
+HASH_BITS = 24
+HASH_MODULUS = 1 << HASH_BITS
+RESULT_FIELDS = ['algorithm', 'frames', 'page_faults', 'miss_ratio', 'disk_references', 'dirty_writes']
+
+
+def page_hash(pids: np.ndarray, pages: np.ndarray) -> np.ndarray:
+    """Spatial sampling hash of (pid, page) keys: the splitmix64 finalizer."""
+    x = pages.astype(np.uint64) * np.uint64(0x9e3779b97f4a7c15) + pids.astype(np.uint64)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xbf58476d1ce4e5b9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94d049bb133111eb)
+    x ^= x >> np.uint64(31)
+    return x & np.uint64(HASH_MODULUS - 1)
+
+
+class ShardsAnalyzer(StackDistanceAnalyzer):
+    """Approximate LRU miss-ratio curve from hash-sampled pages (SHARDS).
+
+    Only references to sampled (pid, page) keys reach the stack, and a reuse
+    at sampled depth d (d - 1 sampled pages in between) stands for depth
+    1 + (d - 1) / rate in the full trace. With a
+    budget, at most that many keys are tracked: when the budget is exceeded
+    the threshold drops to the largest tracked hash and those keys are
+    forgotten, so memory stays constant whatever the footprint. Counts
+    recorded at the old rate are rescaled lazily through weight.
+
+    The curve follows SHARDS-adj: the gap between the expected number of
+    sampled references (N * rate) and the actual one is added to the
+    depth-1 bucket, since a few hot keys can make the sample far from
+    proportional, and the miss ratio is clamped to [0, 1].
+    """
+
+    def __init__(self, page_size: int = MemorySystem.PAGE_SIZE, rate: Optional[float] = None,
+                 budget: Optional[int] = None):
+        super().__init__(page_size)
+        self.threshold = max(1, round((rate or 1.0) * HASH_MODULUS))
+        self.budget = budget
+        self.hashes: List[Tuple[int, Tuple[int, int]]] = []  # max-heap of (-hash, key) when budgeted
+        self.weight = 1.0
+        self.total_references = 0
+        self.cold_weight = 0.0
+        self.sampled_weight = 0.0
+        self.reuse_depths: List[float] = [0.0, 0.0]
+        self.dirty_depths: List[float] = [0.0]
+
+    @property
+    def rate(self) -> float:
+        return self.threshold / HASH_MODULUS
+
+    def record(self, histogram: List[float], depth: int, times: int = 1) -> None:
+        depth = 1 + round((depth - 1) / self.rate)
+        if depth >= len(histogram):
+            histogram.extend([0.0] * (depth + 1 - len(histogram)))
+        histogram[depth] += self.weight * times
+
+    def run_chunk(self, chunk: np.ndarray) -> None:
+        runs = chunk.dtype == RUN_DTYPE
+        self.total_references += int(chunk['count'].sum()) if runs else len(chunk)
+        hashes = page_hash(chunk['pid'], chunk['address'] >> np.uint64(self.page_shift))
+        sampled = np.flatnonzero(hashes < self.threshold)
+        counts = chunk['count'][sampled].tolist() if runs else [1] * len(sampled)
+        for pid, address, is_write, key_hash, count in zip(chunk['pid'][sampled].tolist(),
+                                                           chunk['address'][sampled].tolist(),
+                                                           chunk['write'][sampled].tolist(),
+                                                           hashes[sampled].tolist(), counts):
+            if key_hash >= self.threshold:  # the budget lowered the threshold within this chunk
+                continue
+            key = (pid, address >> self.page_shift)
+            self.sampled_weight += self.weight * count
+            if key not in self.last_position:
+                self.cold_weight += self.weight
+                if self.budget is not None:
+                    heapq.heappush(self.hashes, (-key_hash, key))
+            self.access(pid, address, is_write)
+            if count > 1:
+                self.record(self.reuse_depths, 1, count - 1)  # repeats within a run
+            if self.budget is not None and len(self.last_position) > self.budget:
+                self.shrink()
+
+    def shrink(self) -> None:
+        threshold = -self.hashes[0][0]
+        while self.hashes and -self.hashes[0][0] >= threshold:
+            _, key = heapq.heappop(self.hashes)
+            self.tree.add(self.last_position.pop(key), -1)
+            del self.dirty[key]
+        self.weight *= self.threshold / threshold
+        self.threshold = threshold
+
+    def miss_ratio_curve(self, max_frames: Optional[int] = None) -> List[Dict[str, float]]:
+        """Estimated full-trace counts for every memory size up to max_frames."""
+        if max_frames is None:
+            max_frames = max(1, round(len(self.last_position) / self.rate))
+
+        distinct = len(self.last_position)
+        dirty_depths = list(self.dirty_depths)
+        for key, position in self.last_position.items():
+            if self.dirty[key]:
+                self.record(dirty_depths, distinct - self.tree.prefix_sum(position) + 1)
+
+        size = max(len(self.reuse_depths), len(dirty_depths), max_frames + 2)
+        reuse = np.zeros(size)
+        reuse[:len(self.reuse_depths)] = self.reuse_depths
+        dirty = np.zeros(size)
+        dirty[:len(dirty_depths)] = dirty_depths
+        # Counts are in units of the latest weight at the final rate; one
+        # sampled event stands for 1 / rate references of the full trace.
+        scale = 1 / (self.weight * self.rate)
+        expected = self.total_references / scale
+        reuse[1] += expected - self.sampled_weight  # SHARDS-adj
+        hits = np.cumsum(reuse)
+        dirty_writes = np.cumsum(dirty[::-1])[::-1]
+
+        rows = []
+        for frames in range(1, max_frames + 1):
+            miss_ratio = min(max(1 - hits[frames] / expected, 0.0), 1.0) if expected else 0.0
+            page_faults = miss_ratio * self.total_references
+            writes = min(dirty_writes[frames + 1] * scale, page_faults)
+            rows.append(make_row('LRU', frames, page_faults, writes, self.total_references))
+        return rows
+
+
+def make_row(algorithm: str, frames: int, page_faults: float, dirty_writes: float,
+             references: int) -> Dict[str, object]:
+    return {
+        'algorithm': algorithm,
+        'frames': frames,
+        'page_faults': page_faults,
+        'miss_ratio': page_faults / references if references else 0.0,
+        'disk_references': page_faults + dirty_writes,
+        'dirty_writes': dirty_writes,
+    }
+
+
+def write_sample(input_file: str, output_file: str, threshold: int, page_size: int) -> int:
+    """Write the references to sampled pages as a binary (or run) trace."""
+    page_shift = np.uint64(page_size.bit_length() - 1)
+    writer = None
+    try:
+        for chunk in trace_chunks(input_file, page_size):
+            if writer is None:
+                writer = BinaryTraceWriter(output_file, page_size if chunk.dtype == RUN_DTYPE else None)
+            writer.write(chunk[page_hash(chunk['pid'], chunk['address'] >> page_shift) < threshold])
+    finally:
+        if writer is None:
+            writer = BinaryTraceWriter(output_file)
+        writer.close()
+    return writer.count
+
+
+def miniature_curves(input_file: str, algorithms: List[str], sizes: List[int], threshold: int,
+                     references: int, page_size: int, address_bits: int) -> List[Dict[str, object]]:
+    """Estimate other policies' curves with miniature simulations.
+
+    Each memory of c frames is modelled by simulating c * rate frames on the
+    sampled trace (with PER's reset interval scaled the same way) and
+    scaling the counts back up by 1 / rate.
+    """
+    rate = threshold / HASH_MODULUS
+    reset_interval = max(1, round(MemorySystem.REFERENCE_RESET_INTERVAL * rate))
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        sample_file = os.path.join(tmp, 'sample.bin')
+        write_sample(input_file, sample_file, threshold, page_size)
+        miniature: Dict[int, List] = {}
+        for frames in sizes:
+            mini_frames = max(1, round(frames * rate))
+            if mini_frames not in miniature:
+                miniature[mini_frames] = simulate_all(sample_file, algorithms, physical_pages=mini_frames,
+                                                      page_size=page_size, address_bits=address_bits,
+                                                      reset_interval=reset_interval)
+            for result in miniature[mini_frames]:
+                rows.append(make_row(result.algorithm, frames, result.page_faults / rate,
+                                     result.dirty_writes / rate, references))
+    return rows
+
+
+def estimate(input_file: str, algorithms: List[str], rate: Optional[float] = None, budget: Optional[int] = None,
+             max_frames: Optional[int] = None, sizes: Optional[List[int]] = None,
+             page_size: int = MemorySystem.PAGE_SIZE,
+             address_bits: int = MemorySystem.VIRTUAL_ADDRESS_BITS) -> Tuple[List[Dict[str, object]], int]:
+    """Sampled miss-ratio curves for the given algorithms, and the trace length.
+
+    LRU gets every size from 1 to max_frames from one SHARDS pass. Other
+    algorithms are simulated in miniature at the given sizes, using the rate
+    the SHARDS pass ended with, so a budget bounds their memory too.
+    """
+    analyzer = ShardsAnalyzer(page_size, rate, budget)
+    for chunk in trace_chunks(input_file, page_size):
+        analyzer.run_chunk(chunk)
+    curve = analyzer.miss_ratio_curve(max_frames)
+    max_frames = len(curve)
+
+    rows = curve if 'LRU' in algorithms else []
+    others = [algorithm for algorithm in algorithms if algorithm != 'LRU']
+    if others:
+        if sizes is None:
+            sizes = sorted(set(np.geomspace(1, max_frames, 16).round().astype(int).tolist()))
+        rows += miniature_curves(input_file, others, sizes, analyzer.threshold,
+                                 analyzer.total_references, page_size, address_bits)
+    return rows, analyzer.total_references
+
+
+def exact_rows(input_file: str, rows: List[Dict[str, object]], references: int, page_size: int,
+               address_bits: int) -> List[Dict[str, object]]:
+    """Exact results for the same (algorithm, frames) cells, for error reporting."""
+    exact = []
+    lru = None
+    for row in rows:
+        if row['algorithm'] == 'LRU':
+            if lru is None:
+                lru = analyze(input_file, page_size).miss_ratio_curve(max(r['frames'] for r in rows))
+            exact.append({**lru[row['frames'] - 1], 'algorithm': 'LRU'})
+        else:
+            result = simulate(input_file, row['algorithm'], physical_pages=row['frames'],
+                              page_size=page_size, address_bits=address_bits)
+            exact.append(make_row(row['algorithm'], row['frames'], result.page_faults,
+                                  result.dirty_writes, references))
+    return exact
+
+
+def write_table(rows: List[Dict[str, object]], output, exact: Optional[List[Dict[str, object]]] = None) -> None:
+    fields = RESULT_FIELDS + (['exact_miss_ratio', 'abs_error'] if exact else [])
+    writer = csv.DictWriter(output, fieldnames=fields)
+    writer.writeheader()
+    for i, row in enumerate(rows):
+        line = {**row, 'page_faults': f"{row['page_faults']:.1f}", 'miss_ratio': f"{row['miss_ratio']:.6f}",
+                'disk_references': f"{row['disk_references']:.1f}", 'dirty_writes': f"{row['dirty_writes']:.1f}"}
+        if exact:
+            line['exact_miss_ratio'] = f"{exact[i]['miss_ratio']:.6f}"
+            line['abs_error'] = f"{abs(row['miss_ratio'] - exact[i]['miss_ratio']):.6f}"
+        writer.writerow(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Approximate miss-ratio curves from a hash-sampled trace (SHARDS)')
+    parser.add_argument('input_file', help='Path to a text, binary or run trace')
+    parser.add_argument('--algorithms', nargs='+', choices=ALGORITHMS, default=['LRU'],
+                        help='Algorithms to estimate; LRU uses SHARDS, the others miniature simulations')
+    sampling = parser.add_mutually_exclusive_group()
+    sampling.add_argument('--rate', type=float, default=0.01,
+                          help='Fraction of (pid, page) keys to sample')
+    sampling.add_argument('--budget', type=int,
+                          help='Track at most this many sampled pages, lowering the rate as needed')
+    parser.add_argument('--max-frames', type=int,
+                        help='Largest memory size for LRU (default: estimated number of distinct pages)')
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        help='Memory sizes for the other algorithms (default: 16 sizes up to --max-frames)')
+    parser.add_argument('--page-size', type=int, default=MemorySystem.PAGE_SIZE,
+                        help='Page size in bytes (power of two)')
+    parser.add_argument('--address-bits', type=int, default=MemorySystem.VIRTUAL_ADDRESS_BITS,
+                        help='Width of each process\'s virtual address space in bits (up to 48 for real traces)')
+    parser.add_argument('--exact', action='store_true',
+                        help='Also run the exact simulations and report the error of every estimate')
+    parser.add_argument('--output', help='Write the CSV table here instead of stdout')
+
+    args = parser.parse_args()
+
+    rate = None if args.budget else args.rate
+    rows, references = estimate(args.input_file, args.algorithms, rate, args.budget, args.max_frames,
+                                args.sizes, args.page_size, args.address_bits)
+    exact = (exact_rows(args.input_file, rows, references, args.page_size, args.address_bits)
+             if args.exact else None)
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            write_table(rows, f, exact)
+    else:
+        write_table(rows, sys.stdout, exact)
+
+    if exact:
+        for algorithm in dict.fromkeys(row['algorithm'] for row in rows):
+            errors = [abs(row['miss_ratio'] - exact[i]['miss_ratio'])
+                      for i, row in enumerate(rows) if row['algorithm'] == algorithm]
+            print(f"{algorithm}: mean absolute miss-ratio error {np.mean(errors):.4f}, "
+                  f"max {np.max(errors):.4f}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
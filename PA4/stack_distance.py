@@ -0,0 +1,195 @@
+import argparse
+import csv
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from mem_sim import MemorySystem, trace_chunks
+from trace_io import RUN_DTYPE
+
+
+class FenwickTree:
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, index: int, delta: int) -> None:
+        tree = self.tree
+        size = self.size
+        while index <= size:
+            tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, index: int) -> int:
+        tree = self.tree
+        total = 0
+        while index > 0:
+            total += tree[index]
+            index -= index & -index
+        return total
+
+
+class StackDistanceAnalyzer:
+    """Mattson stack-distance analysis for global LRU.
+
+    Every resident page holds a marker at the time position of its last
+    access in a Fenwick tree, so the LRU stack depth of a page is the number
+    of markers at or after its position, found in O(log n). One pass over the
+    trace gives the LRU fault and dirty-write counts for every memory size:
+    a reuse at depth d faults in every memory smaller than d frames.
+
+    Dirty bits are sticky across evictions, like in MemorySystem, so a page
+    is written back whenever it is evicted after its first write.
+    """
+
+    def __init__(self, page_size: int = MemorySystem.PAGE_SIZE):
+        self.page_shift = page_size.bit_length() - 1
+        self.last_position: Dict[Tuple[int, int], int] = {}
+        self.dirty: Dict[Tuple[int, int], bool] = {}
+        self.capacity = 1024
+        self.tree = FenwickTree(self.capacity)
+        self.next_position = 1
+        self.references = 0
+        self.cold_misses = 0
+        # reuse_depths[d] counts reuses at stack depth d; dirty_depths[d]
+        # counts evictions of dirty pages that happen in memories < d frames.
+        self.reuse_depths: List[int] = [0, 0]
+        self.dirty_depths: List[int] = [0]
+
+    def compact(self) -> None:
+        # Renumber the live markers 1..n so the tree stays proportional to
+        # the number of distinct pages rather than the trace length.
+        keys = sorted(self.last_position, key=self.last_position.__getitem__)
+        self.capacity = max(1024, 2 * len(keys))
+        self.tree = FenwickTree(self.capacity)
+        for position, key in enumerate(keys, 1):
+            self.last_position[key] = position
+            self.tree.add(position, 1)
+        self.next_position = len(keys) + 1
+
+    def record(self, histogram: List[int], depth: int) -> None:
+        if depth >= len(histogram):
+            histogram.extend([0] * (depth + 1 - len(histogram)))
+        histogram[depth] += 1
+
+    def access(self, pid: int, address: int, is_write: bool) -> None:
+        self.references += 1
+        key = (pid, address >> self.page_shift)
+        if self.next_position > self.capacity:
+            self.compact()
+
+        position = self.last_position.get(key)
+        if position is None:
+            self.cold_misses += 1
+            self.dirty[key] = is_write
+        else:
+            depth = len(self.last_position) - self.tree.prefix_sum(position) + 1
+            self.record(self.reuse_depths, depth)
+            if self.dirty[key]:
+                self.record(self.dirty_depths, depth)
+            self.tree.add(position, -1)
+            if is_write:
+                self.dirty[key] = True
+
+        self.last_position[key] = self.next_position
+        self.tree.add(self.next_position, 1)
+        self.next_position += 1
+
+    def run_chunk(self, chunk: np.ndarray) -> None:
+        if chunk.dtype == RUN_DTYPE:
+            self.run_runs(chunk)
+            return
+        
+        access = self.access
+        for pid, address, is_write in zip(chunk['pid'].tolist(), chunk['address'].tolist(),
+                                          chunk['write'].tolist()):
+            access(pid, address, is_write)
+
+    def run_runs(self, runs: np.ndarray) -> None:
+        # Every reference after the first in a run is a reuse of the top of
+        # the stack, i.e. depth 1, which never misses. The dirty bit is
+        # already sticky, so the run's write flag can go with its first
+        # reference.
+        access = self.access
+        repeats = 0
+        for pid, address, count, is_write in zip(runs['pid'].tolist(), runs['address'].tolist(),
+                                                 runs['count'].tolist(), runs['write'].tolist()):
+            access(pid, address, is_write)
+            repeats += count - 1
+        self.reuse_depths[1] += repeats
+        self.references += repeats
+
+    def miss_ratio_curve(self, max_frames: Optional[int] = None) -> List[Dict[str, float]]:
+        """Return one row per memory size from 1 to max_frames frames."""
+        distinct = len(self.last_position)
+        if max_frames is None:
+            max_frames = max(distinct, 1)
+
+        # Pages still resident at the end were evicted from every memory
+        # smaller than their final stack depth.
+        dirty_depths = list(self.dirty_depths)
+        for key, position in self.last_position.items():
+            if self.dirty[key]:
+                self.record(dirty_depths, distinct - self.tree.prefix_sum(position) + 1)
+
+        size = max(len(self.reuse_depths), len(dirty_depths), max_frames + 2)
+        reuse = np.zeros(size, dtype=np.int64)
+        reuse[:len(self.reuse_depths)] = self.reuse_depths
+        dirty = np.zeros(size, dtype=np.int64)
+        dirty[:len(dirty_depths)] = dirty_depths
+
+        # Entry c of a reversed cumulative sum counts depths >= c; a memory
+        # of c frames misses on every depth > c, i.e. entry c + 1.
+        reuse_misses = np.cumsum(reuse[::-1])[::-1]
+        dirty_writes = np.cumsum(dirty[::-1])[::-1]
+
+        rows = []
+        for frames in range(1, max_frames + 1):
+            page_faults = self.cold_misses + int(reuse_misses[frames + 1])
+            writes = int(dirty_writes[frames + 1])
+            rows.append({
+                'frames': frames,
+                'page_faults': page_faults,
+                'miss_ratio': page_faults / self.references if self.references else 0.0,
+                'disk_references': page_faults + writes,
+                'dirty_writes': writes,
+            })
+        return rows
+
+
+def analyze(input_file: str, page_size: int = MemorySystem.PAGE_SIZE) -> StackDistanceAnalyzer:
+    analyzer = StackDistanceAnalyzer(page_size)
+    for chunk in trace_chunks(input_file, page_size):
+        analyzer.run_chunk(chunk)
+    return analyzer
+
+
+def write_table(rows: List[Dict[str, float]], output) -> None:
+    writer = csv.DictWriter(output, fieldnames=['frames', 'page_faults', 'miss_ratio',
+                                                'disk_references', 'dirty_writes'])
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({**row, 'miss_ratio': f"{row['miss_ratio']:.6f}"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LRU miss-ratio curve from one pass over a trace')
+    parser.add_argument('input_file', help='Path to a text or binary memory trace')
+    parser.add_argument('--max-frames', type=int,
+                        help='Largest physical memory size to report (default: number of distinct pages)')
+    parser.add_argument('--page-size', type=int, default=MemorySystem.PAGE_SIZE,
+                        help='Page size in bytes (power of two)')
+    parser.add_argument('--output', help='Write the CSV table here instead of stdout')
+
+    args = parser.parse_args()
+
+    rows = analyze(args.input_file, args.page_size).miss_ratio_curve(args.max_frames)
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            write_table(rows, f)
+    else:
+        write_table(rows, sys.stdout)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import sys
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+from mem_sim import ALGORITHMS, DEFAULT_ALGORITHMS, MemorySystem, simulate
+
+RESULT_FIELDS = ['algorithm', 'physical_pages', 'page_size', 'reset_interval', 'seed',
+                 'page_faults', 'disk_references', 'dirty_writes']
+
+
+def hash_trace(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cell_key(trace_hash: str, cell: Dict[str, object]) -> str:
+    """Cache key for one grid cell: the trace contents plus its parameters."""
+    params = json.dumps(cell, sort_keys=True)
+    return hashlib.sha256(f"{trace_hash}:{params}".encode()).hexdigest()
+
+
+def build_grid(algorithms: List[str], physical_pages: List[int], page_sizes: List[int],
+               reset_intervals: List[int], seed: int = 0) -> List[Dict[str, object]]:
+    cells = []
+    for algorithm, frames, page_size in itertools.product(algorithms, physical_pages, page_sizes):
+        # The reset interval only changes PER results, so other algorithms
+        # get a single cell with no interval.
+        # Only RAND draws random numbers; it gets a fixed seed so a cached
+        # cell is reproducible.
+        for interval in reset_intervals if algorithm == 'PER' else [None]:
+            cells.append({'algorithm': algorithm, 'physical_pages': frames,
+                          'page_size': page_size, 'reset_interval': interval,
+                          'seed': seed if algorithm == 'RAND' else None})
+    return cells
+
+
+def run_cell(job: Tuple[str, Dict[str, object], str]) -> Dict[str, object]:
+    input_file, cell, cache_file = job
+    params = {key: value for key, value in cell.items() if key != 'algorithm'}
+    result = simulate(input_file, cell['algorithm'], **params)
+    row = {**cell, 'page_faults': result.page_faults,
+           'disk_references': result.disk_references, 'dirty_writes': result.dirty_writes}
+
+    # Write to a temporary name first so an interrupted run never leaves a
+    # truncated entry behind.
+    temp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(row, f)
+    os.replace(temp_file, cache_file)
+    return row
+
+
+def sweep(input_file: str, cells: List[Dict[str, object]], cache_dir: str,
+          workers: int) -> List[Dict[str, object]]:
+    """Run every grid cell that is not cached yet and return all results."""
+    os.makedirs(cache_dir, exist_ok=True)
+    trace_hash = hash_trace(input_file)
+
+    rows: Dict[int, Dict[str, object]] = {}
+    jobs, job_indexes = [], []
+    for i, cell in enumerate(cells):
+        cache_file = os.path.join(cache_dir, f"{cell_key(trace_hash, cell)}.json")
+        if os.path.exists(cache_file):
+            with open(cache_file) as f:
+                rows[i] = json.load(f)
+        else:
+            jobs.append((input_file, cell, cache_file))
+            job_indexes.append(i)
+
+    print(f"{len(cells) - len(jobs)} cached, {len(jobs)} to run", file=sys.stderr)
+    if jobs:
+        with Pool(workers) as pool:
+            for i, row in zip(job_indexes, pool.imap(run_cell, jobs)):
+                rows[i] = row
+                print(f"done: {row['algorithm']} frames={row['physical_pages']} "
+                      f"page_size={row['page_size']} interval={row['reset_interval']} seed={row['seed']}", file=sys.stderr)
+
+    return [rows[i] for i in range(len(cells))]
+
+
+def write_table(rows: List[Dict[str, object]], output) -> None:
+    writer = csv.DictWriter(output, fieldnames=RESULT_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({field: row[field] for field in RESULT_FIELDS})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parameter sweep over the virtual memory simulator')
+    parser.add_argument('input_file', help='Path to a text or binary memory trace')
+    parser.add_argument('--algorithms', nargs='+', choices=ALGORITHMS, default=DEFAULT_ALGORITHMS,
+                        help='Page replacement algorithms to sweep')
+    parser.add_argument('--physical-pages', nargs='+', type=int, default=[MemorySystem.PHYSICAL_PAGES],
+                        help='Physical memory sizes in frames')
+    parser.add_argument('--page-sizes', nargs='+', type=int, default=[MemorySystem.PAGE_SIZE],
+                        help='Page sizes in bytes')
+    parser.add_argument('--reset-intervals', nargs='+', type=int,
+                        default=[MemorySystem.REFERENCE_RESET_INTERVAL],
+                        help='PER reference bit reset intervals')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for RAND\'s random number generator in every RAND cell')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes')
+    parser.add_argument('--cache-dir', default='.mem_sim_cache',
+                        help='Directory holding cached cell results')
+    parser.add_argument('--output', help='Write the combined CSV table here instead of stdout')
+
+    args = parser.parse_args()
+
+    cells = build_grid(args.algorithms, args.physical_pages, args.page_sizes, args.reset_intervals,
+                       args.seed)
+    rows = sweep(args.input_file, cells, args.cache_dir, args.workers)
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            write_table(rows, f)
+    else:
+        write_table(rows, sys.stdout)
+
+if __name__ == "__main__":
+    main()
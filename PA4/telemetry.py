@@ -0,0 +1,173 @@
+import argparse
+import csv
+import struct
+import sys
+from collections import Counter
+from typing import Set, Tuple
+
+import numpy as np
+
+# Telemetry files hold an 8 byte magic followed by blocks of up to
+# BLOCK_ROWS rows. Each block is a row count (u64) and then every column of
+# TELEMETRY_DTYPE stored contiguously, so a reader can pull out one column
+# without touching the others. There is one row per window for every process
+# that was active in it (see TelemetryRecorder).
+TELEMETRY_MAGIC = b'MEMTEL01'
+BLOCK_HEADER = struct.Struct('<Q')
+TELEMETRY_DTYPE = np.dtype([('window', '<u8'), ('end_time', '<u8'), ('pid', '<u4'),
+                            ('references', '<u8'), ('faults', '<u8'), ('fault_rate', '<f8'),
+                            ('resident', '<u8'), ('working_set', '<u8')])
+BLOCK_ROWS = 4096
+DEFAULT_WINDOW = 10_000
+
+
+class TelemetryRecorder:
+    """Per-process fault and working-set time series for one MemorySystem.
+
+    Every window references, each process that referenced memory or lost
+    a page in the window gets a row with its references, page faults and
+    fault rate in the window, its resident pages at the end of the window
+    and its working-set size (distinct pages referenced in the window).
+    Processes with no row were idle and kept their resident pages. Rows are
+    buffered in a fixed-size block and streamed to path.
+
+    Resident pages per process are counted as pages fault in and are
+    evicted, so closing a window costs time in proportion to the processes
+    and pages active in it, not to all processes or frames.
+
+    The recorder wraps the system's access(), access_run() and on_evict on
+    the instance, so a system without telemetry runs the unmodified methods
+    and pays nothing. Runs that cross a window boundary are split there,
+    which does not change the simulation.
+    """
+
+    def __init__(self, system, path: str, window: int = DEFAULT_WINDOW):
+        if window <= 0:
+            raise ValueError(f"telemetry window must be positive, got {window}")
+        self.system = system
+        self.window = window
+        self.window_index = 0
+        self.window_end = system.time + window
+        self.references: Counter = Counter()
+        self.faults: Counter = Counter()
+        self.pages: Set[Tuple[int, int]] = set()
+        self.resident: Counter = Counter(pid for pid, _ in system.physical_memory)
+        self.evicted: Set[int] = set()  # processes that lost a page this window
+        self.block = np.zeros(BLOCK_ROWS, dtype=TELEMETRY_DTYPE)
+        self.rows = 0
+        self.file = open(path, 'wb')
+        self.file.write(TELEMETRY_MAGIC)
+        self.wrap()
+
+    def wrap(self) -> None:
+        system = self.system
+        access = system.access
+        access_run = system.access_run
+        on_evict = system.on_evict
+        references, faults, pages = self.references, self.faults, self.pages
+        resident, evicted = self.resident, self.evicted
+        page_shift = system.page_shift
+
+        def recorded_access(pid: int, address: int, is_write: bool) -> None:
+            page_faults = system.page_faults
+            access(pid, address, is_write)
+            references[pid] += 1
+            if system.page_faults != page_faults:
+                faults[pid] += 1
+                resident[pid] += 1
+            pages.add((pid, address >> page_shift))
+            if system.time >= self.window_end:
+                self.end_window()
+
+        def recorded_access_run(pid: int, address: int, count: int, is_write: bool) -> None:
+            # access_run() sends the first reference of each piece through
+            # recorded_access(), so only the repeats are counted here.
+            while count:
+                piece = min(count, self.window_end - system.time)
+                access_run(pid, address, piece, is_write)
+                if piece > 1:
+                    references[pid] += piece - 1
+                count -= piece
+                if system.time >= self.window_end:
+                    self.end_window()
+
+        def recorded_evict(frame: int, pid: int, page_number: int) -> None:
+            resident[pid] -= 1
+            evicted.add(pid)
+            if on_evict is not None:
+                on_evict(frame, pid, page_number)
+
+        system.access = recorded_access
+        system.access_run = recorded_access_run
+        system.on_evict = recorded_evict
+
+    def end_window(self) -> None:
+        system = self.system
+        working_set = Counter(pid for pid, _ in self.pages)
+        for pid in sorted(self.references.keys() | self.evicted):
+            if self.rows == BLOCK_ROWS:
+                self.write_block()
+            references = self.references[pid]
+            self.block[self.rows] = (self.window_index, system.time, pid, references, self.faults[pid],
+                                     self.faults[pid] / references if references else 0.0,
+                                     self.resident[pid], working_set[pid])
+            self.rows += 1
+
+        self.references.clear()
+        self.faults.clear()
+        self.pages.clear()
+        self.evicted.clear()
+        self.window_index += 1
+        self.window_end = system.time + self.window
+
+    def write_block(self) -> None:
+        self.file.write(BLOCK_HEADER.pack(self.rows))
+        for name in TELEMETRY_DTYPE.names:
+            self.file.write(self.block[name][:self.rows].tobytes())
+        self.rows = 0
+
+    def close(self) -> None:
+        """Record the last, partial window and close the file."""
+        if self.references:
+            self.end_window()
+        if self.rows:
+            self.write_block()
+        self.file.close()
+
+
+def load_telemetry(path: str) -> np.ndarray:
+    """Read a telemetry file back as one TELEMETRY_DTYPE array."""
+    blocks = []
+    with open(path, 'rb') as f:
+        if f.read(len(TELEMETRY_MAGIC)) != TELEMETRY_MAGIC:
+            raise ValueError(f"{path} is not a telemetry file")
+        while True:
+            header = f.read(BLOCK_HEADER.size)
+            if not header:
+                break
+            (rows,) = BLOCK_HEADER.unpack(header)
+            block = np.empty(rows, dtype=TELEMETRY_DTYPE)
+            for name in TELEMETRY_DTYPE.names:
+                dtype = TELEMETRY_DTYPE.fields[name][0]
+                block[name] = np.frombuffer(f.read(rows * dtype.itemsize), dtype=dtype)
+            blocks.append(block)
+    return np.concatenate(blocks) if blocks else np.empty(0, dtype=TELEMETRY_DTYPE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print a mem_sim telemetry file as CSV')
+    parser.add_argument('input_file', help='Telemetry file written by mem_sim.py --telemetry')
+    parser.add_argument('--pid', type=int, help='Only print rows for this process')
+
+    args = parser.parse_args()
+
+    rows = load_telemetry(args.input_file)
+    if args.pid is not None:
+        rows = rows[rows['pid'] == args.pid]
+    writer = csv.writer(sys.stdout)
+    writer.writerow(TELEMETRY_DTYPE.names)
+    for row in rows.tolist():
+        writer.writerow(f"{value:.6f}" if isinstance(value, float) else value for value in row)
+
+if __name__ == "__main__":
+    main()
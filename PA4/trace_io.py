@@ -0,0 +1,395 @@
+import argparse
+import contextlib
+import gzip
+import io
+import struct
+import sys
+from typing import BinaryIO, ContextManager, Iterable, Iterator, Optional, TextIO, Tuple
+
+import numpy as np
+
+# Binary trace layout: a 16 byte header (magic, record count) followed by
+# packed little-endian records of (pid: u32, address: u64, write: u8).
+# Traces are memory-mapped and decoded in chunks, never as one object per
+# reference.
+TRACE_MAGIC = b'MEMTRC01'
+HEADER = struct.Struct('<8sQ')
+RECORD_DTYPE = np.dtype([('pid', '<u4'), ('address', '<u8'), ('write', 'u1')])
+CHUNK_SIZE = 1 << 20  # references decoded per chunk
+
+# Run traces store back-to-back references to the same (pid, page) as one
+# record with a reference count and a "was any of them a write" flag. The
+# header adds the page size the runs were built with.
+RUN_MAGIC = b'MEMRUN01'
+RUN_HEADER = struct.Struct('<8sQQ')
+RUN_DTYPE = np.dtype([('pid', '<u4'), ('address', '<u8'), ('count', '<u8'), ('write', 'u1')])
+
+# Traces that cannot be memory-mapped: standard input and gzip or zstd
+# compressed files. They are decoded front to back in bounded chunks.
+STDIN = '-'
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def trace_kind(path: str) -> str:
+    """Return 'binary', 'runs', 'text' or 'stream' for a trace.
+
+    'stream' covers standard input and compressed files, whatever they
+    contain; only the other kinds can be opened more than once or mapped.
+    """
+    if path == STDIN:
+        return 'stream'
+    with open(path, 'rb') as f:
+        magic = f.read(len(TRACE_MAGIC))
+    if magic == TRACE_MAGIC:
+        return 'binary'
+    if magic == RUN_MAGIC:
+        return 'runs'
+    if magic.startswith(GZIP_MAGIC) or magic.startswith(ZSTD_MAGIC):
+        return 'stream'
+    return 'text'
+
+
+def is_binary_trace(path: str) -> bool:
+    return trace_kind(path) in ('binary', 'runs')
+
+
+def parse_text_lines(lines) -> np.ndarray:
+    pids, addresses, writes = [], [], []
+    for line in lines:
+        fields = line.split()
+        if not fields:  # Skip empty lines
+            continue
+        pid, addr, access = fields
+        if access not in ('R', 'W'):
+            raise ValueError(f"{access!r} is not a valid AccessType")
+        pids.append(int(pid))
+        addresses.append(int(addr))
+        writes.append(access == 'W')
+
+    chunk = np.empty(len(pids), dtype=RECORD_DTYPE)
+    chunk['pid'] = pids
+    chunk['address'] = addresses
+    chunk['write'] = writes
+    return chunk
+
+
+def iter_text_chunks(f: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    while True:
+        lines = f.readlines(chunk_size * 16)  # ~16 bytes per text reference
+        if not lines:
+            return
+        chunk = parse_text_lines(lines)
+        if len(chunk):
+            yield chunk
+
+
+def load_binary_trace(path: str) -> np.ndarray:
+    """Memory-map every record of a binary trace."""
+    with open(path, 'rb') as f:
+        magic, count = HEADER.unpack(f.read(HEADER.size))
+    if magic != TRACE_MAGIC:
+        raise ValueError(f"{path} is not a binary memory trace")
+    if count == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER.size, shape=(count,))
+
+
+def load_run_trace(path: str) -> Tuple[np.ndarray, int]:
+    """Memory-map every run of a run trace; also returns its page size."""
+    with open(path, 'rb') as f:
+        magic, count, page_size = RUN_HEADER.unpack(f.read(RUN_HEADER.size))
+    if magic != RUN_MAGIC:
+        raise ValueError(f"{path} is not a run trace")
+    if count == 0:
+        return np.empty(0, dtype=RUN_DTYPE), page_size
+    return np.memmap(path, dtype=RUN_DTYPE, mode='r', offset=RUN_HEADER.size, shape=(count,)), page_size
+
+
+def iter_binary_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    if trace_kind(path) == 'runs':
+        records, _ = load_run_trace(path)
+    else:
+        records = load_binary_trace(path)
+    for start in range(0, len(records), chunk_size):
+        yield records[start:start + chunk_size]
+
+
+class _PrefixedStream(io.RawIOBase):
+    """Replays bytes already read off the front of a stream, then the rest."""
+
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        self.prefix = prefix
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.prefix:
+            size = min(len(buffer), len(self.prefix))
+            buffer[:size] = self.prefix[:size]
+            self.prefix = self.prefix[size:]
+            return size
+        data = self.stream.read1(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_stream(path: str) -> ContextManager[BinaryIO]:
+    """Open standard input or a possibly compressed trace for reading bytes."""
+    if path == STDIN:
+        return contextlib.nullcontext(sys.stdin.buffer)
+    with open(path, 'rb') as f:
+        magic = f.read(len(ZSTD_MAGIC))
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, 'rb')
+    if magic.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(f"reading {path} needs the zstandard package (pip install zstandard)") from None
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    return open(path, 'rb')
+
+
+def check_run_page_size(path: str, run_page_size: int, page_size: Optional[int]) -> None:
+    """A run trace can only be replayed with its own page size or a larger one,
+    since a run of one small page is always a run of the bigger page containing it."""
+    if page_size is not None and page_size < run_page_size:
+        raise ValueError(f"{path} was coalesced with {run_page_size} byte pages "
+                         f"and cannot be simulated with {page_size} byte pages")
+
+
+def iter_stream_chunks(path: str, chunk_size: int = CHUNK_SIZE,
+                       page_size: Optional[int] = None) -> Iterator[np.ndarray]:
+    """Decode any trace front to back, holding at most one chunk in memory.
+
+    The stream's first bytes decide whether it holds text, binary or run
+    records. The record count in a binary header is ignored, so a writer
+    piping records into us never has to seek back and fill it in. A run
+    trace's page size is checked against page_size as for mapped run traces.
+    """
+    with open_stream(path) as stream:
+        magic = stream.read(len(TRACE_MAGIC))
+        if magic == TRACE_MAGIC:
+            stream.read(HEADER.size - len(magic))
+            dtype = RECORD_DTYPE
+        elif magic == RUN_MAGIC:
+            _, _, run_page_size = RUN_HEADER.unpack(magic + stream.read(RUN_HEADER.size - len(magic)))
+            check_run_page_size(path, run_page_size, page_size)
+            dtype = RUN_DTYPE
+        else:
+            text = io.TextIOWrapper(io.BufferedReader(_PrefixedStream(magic, stream)))
+            yield from iter_text_chunks(text, chunk_size)
+            return
+
+        leftover = b''
+        while True:
+            data = stream.read(chunk_size * dtype.itemsize)
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) - len(data) % dtype.itemsize
+            leftover = data[usable:]
+            if usable:
+                yield np.frombuffer(data, dtype=dtype, count=usable // dtype.itemsize)
+        if leftover:
+            raise ValueError(f"{path} ends with a truncated record")
+
+
+def iter_trace_chunks(path: str, chunk_size: int = CHUNK_SIZE,
+                      page_size: Optional[int] = None) -> Iterator[np.ndarray]:
+    """Yield the contents of a trace in chunks.
+
+    Text and binary traces give RECORD_DTYPE arrays; run traces give
+    RUN_DTYPE arrays. Standard input ('-') and gzip or zstd files are
+    streamed, whichever of these they contain. With page_size, a run trace
+    built with larger pages raises ValueError, mapped or streamed.
+    """
+    kind = trace_kind(path)
+    if kind == 'runs':
+        check_run_page_size(path, load_run_trace(path)[1], page_size)
+    if kind in ('binary', 'runs'):
+        yield from iter_binary_chunks(path, chunk_size)
+    elif kind == 'stream':
+        yield from iter_stream_chunks(path, chunk_size, page_size)
+    else:
+        with open(path, 'r') as f:
+            yield from iter_text_chunks(f, chunk_size)
+
+
+def skip_references(chunks: Iterable[np.ndarray], count: int) -> Iterator[np.ndarray]:
+    """Drop the first count references of a chunk stream.
+
+    A run that straddles the cut is shortened to the references after it.
+    """
+    for chunk in chunks:
+        if count > 0:
+            if chunk.dtype == RUN_DTYPE:
+                ends = np.cumsum(chunk['count'], dtype=np.int64)
+                first = int(np.searchsorted(ends, count, side='right'))  # first run not wholly skipped
+                if first == len(chunk):
+                    count -= int(ends[-1]) if len(chunk) else 0
+                    continue
+                skipped = int(ends[first - 1]) if first else 0
+                chunk = chunk[first:].copy()
+                chunk['count'][0] -= count - skipped
+            else:
+                if count >= len(chunk):
+                    count -= len(chunk)
+                    continue
+                chunk = chunk[count:]
+            count = 0
+        yield chunk
+    if count > 0:
+        raise ValueError(f"trace ended {count} references before the resume offset")
+
+
+def coalesce_chunks(chunks: Iterable[np.ndarray], page_size: int) -> Iterator[np.ndarray]:
+    """Merge runs of references to the same (pid, page) into RUN_DTYPE records.
+
+    Each run keeps the address of its first reference. The last run of a
+    chunk is held back so runs spanning chunk boundaries are merged too.
+    Chunks that already hold runs (from a run trace) pass through unchanged.
+    """
+    shift = np.uint64(page_size.bit_length() - 1)
+    pending: Optional[np.ndarray] = None
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        if chunk.dtype == RUN_DTYPE:
+            if pending is not None:
+                yield pending
+                pending = None
+            yield chunk
+            continue
+        pids = chunk['pid']
+        pages = chunk['address'] >> shift
+        change = np.ones(len(chunk), dtype=bool)
+        change[1:] = (pids[1:] != pids[:-1]) | (pages[1:] != pages[:-1])
+        starts = np.flatnonzero(change)
+
+        runs = np.empty(len(starts), dtype=RUN_DTYPE)
+        runs['pid'] = pids[starts]
+        runs['address'] = chunk['address'][starts]
+        runs['count'] = np.diff(np.append(starts, len(chunk)))
+        runs['write'] = np.maximum.reduceat(chunk['write'], starts)
+
+        if pending is not None:
+            if pending['pid'][0] == runs['pid'][0] and pending['address'][0] >> shift == pages[0]:
+                runs['address'][0] = pending['address'][0]
+                runs['count'][0] += pending['count'][0]
+                runs['write'][0] |= pending['write'][0]
+            else:
+                runs = np.concatenate([pending, runs])
+        if len(runs) > 1:
+            yield runs[:-1]
+        pending = runs[-1:].copy()
+
+    if pending is not None:
+        yield pending
+
+
+class BinaryTraceWriter:
+    """Writes a binary trace, or a run trace when page_size is given.
+
+    The record count in the header is filled in on close. A pipe cannot
+    seek, so on standard output ('-') the header holds header_count
+    instead; streaming readers ignore it anyway. With append, records are
+    added to the end of an existing trace of the same kind.
+    """
+
+    def __init__(self, path: str, page_size: Optional[int] = None, header_count: int = 0,
+                 append: bool = False):
+        self.page_size = page_size
+        if append:
+            self.file = open(path, 'r+b')
+            header = HEADER if page_size is None else RUN_HEADER
+            self.count = header.unpack(self.file.read(header.size))[1]
+            self.file.seek(0, io.SEEK_END)
+            return
+        self.file = sys.stdout.buffer if path == STDIN else open(path, 'wb')
+        self.count = 0
+        self.write_header(header_count)
+
+    def write_header(self, count: int) -> None:
+        if self.page_size is None:
+            self.file.write(HEADER.pack(TRACE_MAGIC, count))
+        else:
+            self.file.write(RUN_HEADER.pack(RUN_MAGIC, count, self.page_size))
+
+    def write(self, chunk: np.ndarray) -> None:
+        dtype = RECORD_DTYPE if self.page_size is None else RUN_DTYPE
+        self.file.write(np.ascontiguousarray(chunk, dtype=dtype).tobytes())
+        self.count += len(chunk)
+
+    def close(self) -> None:
+        if self.file is sys.stdout.buffer:
+            self.file.flush()
+            return
+        self.file.seek(0)
+        self.write_header(self.count)
+        self.file.close()
+
+    def __enter__(self) -> 'BinaryTraceWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def convert_text_trace(input_file: str, output_file: str, page_size: Optional[int] = None) -> int:
+    """Write a text trace, or any streamed trace, as a binary trace.
+
+    A streamed run trace is written as a run trace labelled with page_size,
+    which must be given and is checked against the trace's own page size.
+    """
+    writer = None
+    try:
+        for chunk in iter_trace_chunks(input_file, page_size=page_size):
+            if writer is None:
+                if chunk.dtype == RUN_DTYPE and page_size is None:
+                    raise ValueError(f"{input_file} holds a run trace; decompress it instead")
+                writer = BinaryTraceWriter(output_file, page_size if chunk.dtype == RUN_DTYPE else None)
+            writer.write(chunk)
+    finally:
+        if writer is None:
+            writer = BinaryTraceWriter(output_file)
+        writer.close()
+    return writer.count
+
+
+def write_run_trace(input_file: str, output_file: str, page_size: int) -> int:
+    """Coalesce a text or binary trace into a run trace."""
+    if trace_kind(input_file) == 'runs':
+        raise ValueError(f"{input_file} is already a run trace")
+    with BinaryTraceWriter(output_file, page_size) as writer:
+        for runs in coalesce_chunks(iter_trace_chunks(input_file), page_size):
+            writer.write(runs)
+    return writer.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a memory trace to the binary or run trace format')
+    parser.add_argument('input_file', help='Text trace with one "<pid> <address> <R|W>" reference per line, '
+                        'or a binary trace when --runs is given; "-" reads standard input, and gzip or '
+                        'zstd compressed traces are decompressed on the fly')
+    parser.add_argument('output_file', help='Path of the trace to write')
+    parser.add_argument('--runs', action='store_true',
+                        help='Coalesce back-to-back references to the same page into a run trace')
+    parser.add_argument('--page-size', type=int, default=512,
+                        help='Page size used to coalesce runs; the trace can only be simulated '
+                        'with this page size or a larger one')
+
+    args = parser.parse_args()
+
+    if args.runs:
+        count = write_run_trace(args.input_file, args.output_file, args.page_size)
+        print(f"Wrote {count} runs to {args.output_file}")
+    else:
+        count = convert_text_trace(args.input_file, args.output_file)
+        print(f"Wrote {count} references to {args.output_file}")
+
+if __name__ == "__main__":
+    main()